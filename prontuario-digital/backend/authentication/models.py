@@ -18,6 +18,8 @@ class User(AbstractUser):
     role = models.CharField(max_length=11, choices=ROLE_CHOICES)
     email = models.EmailField(unique=True, verbose_name="E-mail")
     must_change_password = models.BooleanField(default=False)
+    # Entry payloads embed the author's name: timelines use this to revalidate
+    updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = "email"
 
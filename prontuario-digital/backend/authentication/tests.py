@@ -1,3 +1,51 @@
-from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
+from authentication.models import User, HealthProfile
+import json
 
-# Create your tests here.
+
+class UserListStreamingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+            first_name="Admin",
+        )
+        for i in range(5):
+            user = User.objects.create_user(
+                username=f"prof{i}",
+                email=f"prof{i}@example.com",
+                password="testpassword123",
+                role="health_prof",
+                first_name=f"Prof {i}",
+            )
+            HealthProfile.objects.create(
+                user=user, specialty="psychologist", council_number=str(i)
+            )
+        cls.url = "/api/auth/users/"
+
+    def test_stream_matches_regular_list(self):
+        self.client.force_authenticate(user=self.admin_user)
+        regular = self.client.get(self.url)
+        with patch("utils.streaming.STREAM_CHUNK_SIZE", 2):
+            streamed = self.client.get(self.url, {"stream": "true"})
+
+        self.assertEqual(streamed.status_code, status.HTTP_200_OK)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(streamed["Content-Type"], "application/json")
+        body = json.loads(b"".join(streamed.streaming_content))
+        self.assertEqual(body, json.loads(regular.content))
+        self.assertEqual(len(body), 6)
+
+    def test_list_loads_health_profiles_in_the_same_query(self):
+        self.client.force_authenticate(user=self.admin_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
@@ -14,6 +14,7 @@ from .serializers import (
     AdminPasswordResetSerializer,
 )
 from authentication.permissions import IsManagerUser, AdminWriteAllRead, IsAdminUser
+from utils.streaming import stream_json_array, wants_stream
 
 
 class SessionLoginView:
@@ -127,10 +128,21 @@ class SessionLoginView:
 
 
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all().order_by("first_name")
+    queryset = User.objects.select_related("health_profile").order_by("first_name")
     serializer_class = UserSerializer
     permission_classes = [AdminWriteAllRead]
 
+    def list(self, request, *args, **kwargs):
+        """
+        ?stream=true envia a lista em streaming, serializada em blocos
+        """
+        if wants_stream(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            return stream_json_array(
+                queryset, lambda users: self.get_serializer(users, many=True).data
+            )
+        return super().list(request, *args, **kwargs)
+
     @action(
         detail=True,
         methods=["post"],
@@ -7,7 +7,7 @@ import random
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medicalrecord.settings")
 django.setup()
 
-from medicalentry.models import MedicalEntry
+from medicalentry.models import MedicalEntry, MonthlyEntryRollup
 from students.models import Student
 from authentication.models import User
 
@@ -162,6 +162,7 @@ def create_test_medical_entries():
     # Salvar todas as entradas no banco
     try:
         MedicalEntry.objects.bulk_create(new_entries)
+        MonthlyEntryRollup.objects.record_entries(new_entries)
         print(f"\n✅ SUCESSO: {len(new_entries)} entradas médicas criadas!")
         print(f"   - {len(physiotherapy_entries)} entradas de fisioterapia")
         print(f"   - {len(psychology_entries)} entradas de psicologia")
@@ -195,7 +196,8 @@ def clean_test_entries():
 
     try:
         student = Student.objects.get(id=STUDENT_ID)
-        deleted_count = MedicalEntry.objects.filter(student=student).delete()[0]
+        entries = MedicalEntry.all_with_deleted.filter(student=student)
+        deleted_count = entries.delete()[0]
         print(f"🗑️  {deleted_count} entradas removidas para o estudante {student}")
     except Student.DoesNotExist:
         print(f"Estudante com ID {STUDENT_ID} não encontrado")
@@ -0,0 +1,107 @@
+"""
+Cache versionado da linha do tempo de um estudante (medical_entry_by_student)
+e dos agregados do dashboard (medical_entry_aggregates).
+
+A chave combina o recurso, o escopo de quem lê (papel/especialidade) e a
+versão atual. Qualquer gravação de entrada incrementa a versão, então as
+chaves antigas simplesmente deixam de ser lidas e expiram sozinhas.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from utils.conditional import viewer_scope
+from utils.versioned_cache import bump_version, current_version, digest, invalidate
+
+KEY_PREFIX = "medentry:timeline"
+AGGREGATES_KEY_PREFIX = "medentry:aggregates"
+AGGREGATES_VERSION_KEY = f"{AGGREGATES_KEY_PREFIX}:version"
+STATS_KEYS = {"hits": f"{KEY_PREFIX}:stats:hits", "misses": f"{KEY_PREFIX}:stats:misses"}
+
+
+def _version_key(student_id):
+    return f"{KEY_PREFIX}:version:{student_id}"
+
+
+def timeline_version(student_id):
+    return current_version(_version_key(student_id))
+
+
+def bump_timeline_version(student_id):
+    bump_version(_version_key(student_id))
+
+
+def invalidate_timeline(student_id):
+    invalidate(_version_key(student_id))
+
+
+def timeline_key(student_id, user, state=()):
+    """
+    `state` is the cheap aggregate the view already computes for its ETag;
+    it keeps a rolled-back write from serving a timeline it never committed.
+    """
+    scope = ":".join(viewer_scope(user))
+    version = timeline_version(student_id)
+    return f"{KEY_PREFIX}:{student_id}:{scope}:{version}:{digest(state)}"
+
+
+def bump_aggregates_version():
+    bump_version(AGGREGATES_VERSION_KEY)
+
+
+def invalidate_aggregates():
+    """
+    Os agregados cobrem todas as entradas, então qualquer gravação invalida
+    """
+    invalidate(AGGREGATES_VERSION_KEY)
+
+
+def invalidate_entry_caches(student_id):
+    """
+    Linha do tempo do estudante e agregados, com um único callback pós-commit
+    """
+    invalidate(_version_key(student_id), AGGREGATES_VERSION_KEY)
+
+
+def aggregates_key(user, params):
+    """
+    `params` are the filters and period of the request
+    """
+    scope = ":".join(viewer_scope(user))
+    version = current_version(AGGREGATES_VERSION_KEY)
+    return f"{AGGREGATES_KEY_PREFIX}:{scope}:{version}:{digest(params)}"
+
+
+def get_aggregates(key):
+    return cache.get(key)
+
+
+def set_aggregates(key, aggregates):
+    cache.set(key, aggregates, settings.MEDICAL_ENTRY_AGGREGATES_CACHE_TIMEOUT)
+
+
+def _count(name):
+    try:
+        cache.incr(STATS_KEYS[name])
+    except ValueError:
+        if not cache.add(STATS_KEYS[name], 1, timeout=None):
+            cache.incr(STATS_KEYS[name])
+
+
+def get_timeline(key):
+    entries = cache.get(key)
+    _count("misses" if entries is None else "hits")
+    return entries
+
+
+def set_timeline(key, entries):
+    cache.set(key, entries, settings.MEDICAL_ENTRY_TIMELINE_CACHE_TIMEOUT)
+
+
+def timeline_cache_stats():
+    values = cache.get_many(STATS_KEYS.values())
+    return {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def reset_timeline_cache_stats():
+    cache.delete_many(STATS_KEYS.values())
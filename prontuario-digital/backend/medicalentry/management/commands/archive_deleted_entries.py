@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from medicalentry.models import ArchivedMedicalEntry, MedicalEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as entradas excluídas há mais de --days dias (padrão "
+        "MEDICAL_ENTRY_ARCHIVE_RETENTION_DAYS) para o arquivo, em lotes de "
+        "transações curtas. Pensado para rodar agendado (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.MEDICAL_ENTRY_ARCHIVE_RETENTION_DAYS
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Só conta as entradas que seriam arquivadas",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1")
+
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        if options["dry_run"]:
+            pending = MedicalEntry.all_with_deleted.filter(
+                deleted=True, delete_date__lt=cutoff
+            ).count()
+            self.stdout.write(f"{pending} entradas seriam arquivadas")
+            return
+
+        start = time.perf_counter()
+        total = 0
+        while True:
+            moved = ArchivedMedicalEntry.objects.archive_batch(
+                cutoff, options["batch_size"]
+            )
+            total += moved
+            if moved < options["batch_size"]:
+                break
+        self.stdout.write(
+            f"{total} entradas arquivadas em {time.perf_counter() - start:.1f}s"
+        )
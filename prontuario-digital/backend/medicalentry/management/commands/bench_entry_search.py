@@ -0,0 +1,131 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from authentication.models import HealthProfile, User
+from medicalentry.models import MedicalEntry
+from medicalentry.views import ENTRY_ORDERING
+from students.models import Student
+
+WORDS = [
+    "ansiedade", "lombar", "postura", "fala", "leitura", "atenção", "marcha",
+    "equilíbrio", "família", "escola", "comportamento", "respiração", "dor",
+    "avaliação", "sessão", "evolução", "exercício", "fonema", "coordenação",
+    "motora", "social", "visita", "orientação", "responsável", "frequência",
+    "alongamento", "linguagem", "memória", "rotina", "sono", "alimentação",
+    "interação", "concentração", "fortalecimento", "deglutição", "crise",
+]
+
+SEARCH_TERMS = ["ansiedade", "dor lombar", "deglutição", "coordenação motora"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a busca textual (q=) de MedicalEntry contra ILIKE em uma base "
+        "sintética. Os dados são gerados dentro de uma transação desfeita no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=1_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["entries"])
+
+            self.stdout.write(
+                f"{'termo':<22} {'tsvector+GIN (ms)':>18} {'ILIKE (ms)':>12}"
+            )
+            for term in SEARCH_TERMS:
+                fts = self.measure(
+                    lambda: MedicalEntry.objects.search(term).order_by(
+                        "-rank", *ENTRY_ORDERING
+                    ),
+                    options,
+                )
+                ilike = self.measure(
+                    lambda: MedicalEntry.objects.filter(
+                        Q(description__icontains=term) | Q(notes__icontains=term)
+                    ).order_by(*ENTRY_ORDERING),
+                    options,
+                )
+                self.stdout.write(f"{term:<22} {fts:>18.2f} {ilike:>12.2f}")
+
+            plan = MedicalEntry.objects.search(SEARCH_TERMS[0]).order_by(
+                "-rank", *ENTRY_ORDERING
+            )[: options["page_size"]]
+            self.stdout.write("\n" + plan.explain(analyze=True))
+
+            transaction.set_rollback(True)
+
+    def measure(self, build_queryset, options):
+        timings = []
+        for _ in range(options["repeat"]):
+            start = time.perf_counter()
+            list(build_queryset()[: options["page_size"]])
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    def seed(self, count):
+        healthpro = User.objects.create_user(
+            username="bench.hp",
+            email="bench.hp@example.com",
+            password=None,
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=healthpro, specialty="psychologist", council_number="0"
+        )
+        student = Student.objects.create(
+            name="Bench Student",
+            cgm="0000000000",
+            dob="2010-01-01",
+            gender="O",
+            guardian="Bench Guardian",
+            guardian_cpf="12345678909",
+            address="Rua Bench",
+            cep="00000000",
+            city="Londrina",
+            state="PR",
+        )
+
+        # Vocabulário de preenchimento grande e termos clínicos em ~2% dos campos,
+        # para que a seletividade se pareça com a de textos reais
+        filler = "'t' || floor(random() * %(filler)s)::int"
+        term = (
+            "CASE WHEN random() < 0.02 "
+            "THEN (%(words)s)[1 + floor(random() * %(size)s)::int] END"
+        )
+        phrase = "concat_ws(' ', " + ", ".join([filler] * 6 + [term]) + ")"
+        table = MedicalEntry._meta.db_table
+
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (student_id, healthpro_id, entry_date, updated_at,
+                     description, notes, specialty, deleted)
+                SELECT %(student)s, %(healthpro)s,
+                       now() - g * interval '1 minute',
+                       now() - g * interval '1 minute',
+                       {phrase}, {phrase}, 'psychologist', false
+                FROM generate_series(1, %(count)s) AS g
+                """,
+                {
+                    "student": student.pk,
+                    "healthpro": healthpro.pk,
+                    "count": count,
+                    "words": WORDS,
+                    "size": len(WORDS),
+                    "filler": 50_000,
+                },
+            )
+            cursor.execute(f"ANALYZE {table}")
+
+        self.stdout.write(
+            f"{count} entradas geradas em {time.perf_counter() - start:.1f}s\n"
+        )
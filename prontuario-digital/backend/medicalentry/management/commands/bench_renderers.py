@@ -0,0 +1,58 @@
+import gzip
+
+import msgpack
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from medicalentry.models import MedicalEntry
+from medicalentry.serializers import MedicalEntrySerializer
+from utils.renderers import MessagePackRenderer, ORJSONRenderer
+from utils.serializers import ValuesSerializer
+
+from .bench_serializers import Command as BenchSerializersCommand
+
+
+class Command(BenchSerializersCommand):
+    help = (
+        "Compara o tempo de render e o tamanho do payload da listagem de "
+        "entradas com o JSONRenderer do DRF, orjson e MessagePack. Os dados "
+        "são gerados dentro de uma transação desfeita no fim."
+    )
+
+    def handle(self, *args, **options):
+        renderers = [
+            ("json (DRF)", JSONRenderer()),
+            ("orjson", ORJSONRenderer()),
+            ("msgpack", MessagePackRenderer()),
+        ]
+        with transaction.atomic():
+            self.seed(max(options["rows"]))
+            queryset = MedicalEntry.objects.order_by("-entry_date", "-id")
+            fast = ValuesSerializer(MedicalEntrySerializer())
+
+            self.stdout.write(
+                f"{'renderer':<12} {'linhas':>8} {'render (ms)':>12} "
+                f"{'bytes':>12} {'gzip':>10}"
+            )
+            for rows in options["rows"]:
+                # Same payload medical_entry_list builds, rendered only
+                data = fast.data(queryset[:rows])
+                expected, baseline = None, None
+                for name, renderer in renderers:
+                    output, elapsed = self.measure(
+                        lambda: renderer.render(data), options["repeat"]
+                    )
+                    if renderer.format == "json":
+                        expected = expected or output
+                        if output != expected:
+                            self.stderr.write(f"{name}: JSON diferente do DRF")
+                    elif msgpack.unpackb(output) != data:
+                        self.stderr.write(f"{name}: payload diferente do original")
+                    baseline = baseline or elapsed
+                    self.stdout.write(
+                        f"{name:<12} {rows:>8} {elapsed:>12.1f} "
+                        f"{len(output):>12} {len(gzip.compress(output)):>10} "
+                        f"({baseline / elapsed:.1f}x)"
+                    )
+
+            transaction.set_rollback(True)
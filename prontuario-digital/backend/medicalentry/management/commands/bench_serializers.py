@@ -0,0 +1,132 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from authentication.models import HealthProfile, User
+from medicalentry.models import MedicalEntry
+from medicalentry.serializers import MedicalEntrySerializer
+from students.models import Student
+from students.serializers import StudentSerializer
+from utils.serializers import ValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara MedicalEntrySerializer/StudentSerializer com o caminho rápido "
+        "(ValuesSerializer): consulta + serialização + render JSON. Os dados são "
+        "gerados dentro de uma transação desfeita no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[10_000, 100_000]
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        with transaction.atomic():
+            self.seed(max(options["rows"]))
+
+            cases = [
+                (
+                    "MedicalEntry",
+                    MedicalEntrySerializer,
+                    MedicalEntry.objects.order_by("-entry_date", "-id"),
+                ),
+                ("Student", StudentSerializer, Student.objects.order_by("name")),
+            ]
+            self.stdout.write(
+                f"{'serializer':<14} {'linhas':>8} {'DRF (ms)':>10} "
+                f"{'values (ms)':>12} {'ganho':>7}"
+            )
+            for name, serializer_class, queryset in cases:
+                for rows in options["rows"]:
+                    # A fresh slice per run: an evaluated QuerySet would cache
+                    # its rows and hide the query cost from the DRF side
+                    drf_bytes, drf = self.measure(
+                        lambda: renderer.render(
+                            serializer_class(queryset.all()[:rows], many=True).data
+                        ),
+                        options["repeat"],
+                    )
+                    fast_bytes, fast = self.measure(
+                        lambda: renderer.render(
+                            ValuesSerializer(serializer_class()).data(
+                                queryset.all()[:rows]
+                            )
+                        ),
+                        options["repeat"],
+                    )
+                    if fast_bytes != drf_bytes:
+                        self.stderr.write(f"{name}: saídas diferentes com {rows} linhas")
+                    self.stdout.write(
+                        f"{name:<14} {rows:>8} {drf:>10.0f} {fast:>12.0f} "
+                        f"{drf / fast:>6.1f}x"
+                    )
+
+            transaction.set_rollback(True)
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return output, min(timings)
+
+    def seed(self, count):
+        healthpro = User.objects.create_user(
+            username="bench.hp",
+            email="bench.hp@example.com",
+            password=None,
+            role="health_prof",
+            first_name="Bench",
+            last_name="Prof",
+        )
+        HealthProfile.objects.create(
+            user=healthpro, specialty="psychologist", council_number="0"
+        )
+
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Student._meta.db_table}
+                    (id, created_at, updated_at, created_by_id, active, name, cgm,
+                     dob, gender, guardian, guardian_cpf, address, cep, city, state)
+                SELECT gen_random_uuid(), now(), now(), %(healthpro)s, true,
+                       'Bench Student ' || g, lpad(g::text, 10, '0'),
+                       date '2010-01-01' + (g %% 3000), 'O', 'Bench Guardian',
+                       '12345678909', 'Rua Bench ' || g, '86000000', 'Londrina', 'PR'
+                FROM generate_series(1, %(count)s) AS g
+                """,
+                {"healthpro": healthpro.pk, "count": count},
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {MedicalEntry._meta.db_table}
+                    (student_id, healthpro_id, entry_date, updated_at,
+                     description, notes, specialty, deleted)
+                SELECT s.id, %(healthpro)s,
+                       now() - s.n * interval '1 minute',
+                       now() - s.n * interval '1 minute',
+                       'Sessão de acompanhamento ' || s.n,
+                       CASE WHEN s.n %% 3 = 0 THEN 'Observações da sessão' END,
+                       'psychologist', false
+                FROM (
+                    SELECT id, row_number() OVER () AS n
+                    FROM {Student._meta.db_table}
+                ) AS s
+                """,
+                {"healthpro": healthpro.pk},
+            )
+            cursor.execute(f"ANALYZE {Student._meta.db_table}")
+            cursor.execute(f"ANALYZE {MedicalEntry._meta.db_table}")
+
+        self.stdout.write(
+            f"{count} estudantes e entradas geradas em "
+            f"{time.perf_counter() - start:.1f}s\n"
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from medicalentry.partitioning import (
+    create_partitions,
+    detect_interval,
+    is_partitioned,
+    next_period,
+    partitions,
+    period_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria com antecedência as partições futuras da tabela de entradas "
+        "(depois de partition_medical_entries). Rode periodicamente (cron); "
+        "partições que já existem são mantidas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Períodos futuros que devem existir além do atual",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not is_partitioned(cursor):
+                raise CommandError(
+                    "The entry table is not partitioned; run partition_medical_entries"
+                )
+            interval = detect_interval(partitions(cursor))
+            if interval is None:
+                raise CommandError("Could not tell the partition interval")
+
+            today = timezone.localdate()
+            last = today
+            for _ in range(options["ahead"]):
+                last = next_period(period_start(last, interval), interval)
+            created = create_partitions(cursor, today, last, interval)
+
+        if created:
+            self.stdout.write(f"Criadas: {', '.join(created)}")
+        else:
+            self.stdout.write("Nenhuma partição nova necessária")
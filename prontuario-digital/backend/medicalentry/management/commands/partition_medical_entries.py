@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from medicalentry.partitioning import (
+    INTERVALS,
+    PartitioningError,
+    convert_to_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Converte a tabela de entradas em uma tabela particionada por entry_date "
+        "(mensal ou anual), copiando dados, índices e chaves estrangeiras em uma "
+        "única transação. A tabela fica bloqueada durante a cópia; faça backup "
+        "antes. Depois, agende create_entry_partitions para criar as próximas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", choices=INTERVALS, default="month")
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Períodos futuros a criar além do atual",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            created = convert_to_partitioned(options["interval"], options["ahead"])
+        except PartitioningError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(f"{len(created)} partições: {', '.join(created)}")
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from medicalentry.models import MonthlyEntryRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o rollup mensal de entradas (MonthlyEntryRollup) a partir das "
+        "entradas e confere o resultado. Com --verify-only apenas confere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Não reconstrói; só compara o rollup atual com as entradas",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            start = time.perf_counter()
+            rows = MonthlyEntryRollup.objects.rebuild()
+            self.stdout.write(
+                f"{rows} linhas recalculadas em {time.perf_counter() - start:.1f}s"
+            )
+
+        mismatches = MonthlyEntryRollup.objects.verify()
+        for month, specialty, healthpro, student, expected, actual in mismatches[:20]:
+            self.stderr.write(
+                f"{month:%Y-%m} {specialty} profissional={healthpro} "
+                f"estudante={student}: esperado {expected}, rollup {actual}"
+            )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} contagens divergentes no rollup")
+        self.stdout.write("Rollup confere com as entradas")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from medicalentry.cache import reset_timeline_cache_stats, timeline_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra os contadores de acerto/falha do cache de linha do tempo por "
+        "estudante. Com o cache local (sem REDIS_URL) os valores são do processo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Zera os contadores após exibir"
+        )
+
+    def handle(self, *args, **options):
+        stats = timeline_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total * 100 if total else 0
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_ratio={ratio:.1f}%"
+        )
+        if options["reset"]:
+            reset_timeline_cache_stats()
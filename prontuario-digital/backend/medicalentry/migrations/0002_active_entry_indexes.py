@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 11:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalentry', '0001_initial'),
+        ('students', '0003_alter_student_guardian_cpf'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['-entry_date', '-id'], name='medentry_active_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['student', '-entry_date', '-id'], name='medentry_active_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=models.Index(fields=['entry_date'], name='medentry_entry_date_idx'),
+        ),
+    ]
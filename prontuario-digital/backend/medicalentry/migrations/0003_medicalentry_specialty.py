@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 11:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_specialty(apps, schema_editor):
+    """
+    Copies the current specialty of each author onto their existing entries
+    """
+    MedicalEntry = apps.get_model("medicalentry", "MedicalEntry")
+    HealthProfile = apps.get_model("authentication", "HealthProfile")
+
+    author_specialty = HealthProfile.objects.filter(
+        user_id=models.OuterRef("healthpro_id")
+    ).values("specialty")[:1]
+    MedicalEntry.objects.filter(specialty__isnull=True).update(
+        specialty=models.Subquery(author_specialty)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalentry', '0002_active_entry_indexes'),
+        ('students', '0003_alter_student_guardian_cpf'),
+        ('authentication', '0002_user_must_change_password'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalentry',
+            name='specialty',
+            field=models.CharField(blank=True, db_comment='Author specialty when the entry was written', editable=False, help_text='Especialidade do profissional no momento do registro', max_length=100, null=True),
+        ),
+        migrations.RunPython(backfill_specialty, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['specialty', '-entry_date', '-id'], name='medentry_active_specialty_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 11:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalentry', '0003_medicalentry_specialty'),
+        ('students', '0003_alter_student_guardian_cpf'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalentry',
+            name='search_vector',
+            field=models.GeneratedField(db_comment='Portuguese full-text vector over description and notes', db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('description', config='portuguese', weight='A'), '||', django.contrib.postgres.search.SearchVector('notes', config='portuguese', weight='B'), django.contrib.postgres.search.SearchConfig('portuguese')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='medentry_search_vector_idx'),
+        ),
+    ]
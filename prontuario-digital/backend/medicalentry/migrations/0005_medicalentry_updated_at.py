@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 11:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    """
+    Existing rows get the migration time from AddField; use the last known
+    change instead so the first delta sync keeps a meaningful order
+    """
+    MedicalEntry = apps.get_model("medicalentry", "MedicalEntry")
+    MedicalEntry.objects.update(
+        updated_at=Coalesce(models.F("delete_date"), models.F("entry_date"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalentry', '0004_medicalentry_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_comment='Last change (creation or soft delete), used by delta sync'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=models.Index(fields=['updated_at', 'id'], name='medentry_updated_idx'),
+        ),
+    ]
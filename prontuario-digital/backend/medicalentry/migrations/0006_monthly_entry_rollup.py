@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rollup(apps, schema_editor):
+    """
+    Same aggregation as MonthlyEntryRollup.objects.rebuild(), over the
+    entries that already exist
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO medicalentry_monthlyentryrollup
+                (month, specialty, healthpro_id, student_id, count)
+            SELECT DATE_TRUNC('month', entry_date AT TIME ZONE %s)::date,
+                   specialty, healthpro_id, student_id, COUNT(*)
+            FROM medicalentry_medicalentry
+            WHERE NOT deleted
+            GROUP BY 1, 2, 3, 4
+            """,
+            [settings.TIME_ZONE],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalentry', '0005_medicalentry_updated_at'),
+        ('students', '0005_student_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyEntryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(db_comment='First day of the month, local time')),
+                ('specialty', models.CharField(blank=True, max_length=100, null=True)),
+                ('count', models.IntegerField(db_comment='Active (not deleted) entries', default=0)),
+                ('healthpro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='students.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('month', 'specialty', 'healthpro', 'student'), name='medentry_rollup_key', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 12:04
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicalentry', '0006_monthly_entry_rollup'),
+        ('students', '0005_student_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMedicalEntry',
+            fields=[
+                ('id', models.IntegerField(db_comment='Original MedicalEntry id', primary_key=True, serialize=False)),
+                ('entry_date', models.DateTimeField()),
+                ('description', models.CharField(max_length=500)),
+                ('notes', models.CharField(max_length=500, null=True)),
+                ('specialty', models.CharField(blank=True, max_length=100, null=True)),
+                ('delete_date', models.DateTimeField(blank=True, null=True)),
+                ('delete_reason', models.CharField(blank=True, max_length=200, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='medicalentry',
+            index=models.Index(condition=models.Q(('deleted', True)), fields=['delete_date'], name='medentry_deleted_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmedicalentry',
+            name='deleted_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedmedicalentry',
+            name='healthpro',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedmedicalentry',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_medical_entries', to='students.student'),
+        ),
+    ]
@@ -1,11 +1,155 @@
-from django.db import models
+from collections import Counter
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+from django.db.models import Count, F, Q, Subquery, Value
+from django.db.models.functions import Cast, Now, TruncMonth
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
 from students.models import Student
-from authentication.models import User
+from authentication.models import HealthProfile, User
 from django.utils import timezone
+from .cache import invalidate_entry_caches
 
 # Create your models here.
 
 
+def activity_counts(rows):
+    """
+    Contagens por especialidade, por profissional e por mês, mais o total, em
+    uma única consulta: GROUP BY GROUPING SETS sobre `rows`, um values() com
+    g_specialty, g_healthpro, g_first_name, g_last_name, g_month e g_count.
+    """
+    counts = {
+        "total": 0,
+        "by_specialty": [],
+        "by_professional": [],
+        "by_month": [],
+    }
+    try:
+        inner_sql, params = rows.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        # rows is .none(), e.g. visible_to() for a health_prof without profile
+        return counts
+    # GROUPING() tells a rolled-up NULL from a real one (entries whose
+    # author had no profile have no specialty)
+    sql = f"""
+        SELECT GROUPING(g_specialty, g_healthpro, g_month), g_specialty,
+               g_healthpro, g_first_name, g_last_name, g_month,
+               COALESCE(SUM(g_count), 0)
+        FROM ({inner_sql}) AS entries
+        GROUP BY GROUPING SETS (
+            (g_specialty),
+            (g_healthpro, g_first_name, g_last_name),
+            (g_month),
+            ()
+        )
+    """
+    with connections[rows.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        result = cursor.fetchall()
+
+    for grouping, specialty, pro, first, last, month, count in result:
+        if grouping == 0b011:
+            counts["by_specialty"].append({"specialty": specialty, "count": count})
+        elif grouping == 0b101:
+            name = f"{first} {last}".strip()
+            counts["by_professional"].append({"id": pro, "name": name, "count": count})
+        elif grouping == 0b110:
+            month = month.strftime("%Y-%m")
+            counts["by_month"].append({"month": month, "count": count})
+        else:
+            counts["total"] = count
+
+    counts["by_specialty"].sort(key=lambda row: (-row["count"], row["specialty"] or ""))
+    counts["by_professional"].sort(key=lambda row: (-row["count"], row["name"]))
+    counts["by_month"].sort(key=lambda row: row["month"])
+    return counts
+
+
+class SpecialtyScopedQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Regra de visibilidade por especialidade:
+        health_prof só vê entradas de profissionais da mesma especialidade
+        """
+        if user.role != "health_prof":
+            return self
+
+        if not hasattr(user, "health_profile"):
+            return self.none()
+
+        return self.filter(specialty=user.health_profile.specialty)
+
+    def with_viewer_specialty(self, user):
+        """
+        Anota `viewer_specialty`, a especialidade do perfil de `user` (None se
+        ele não tiver perfil), para checar o acesso na mesma consulta
+        """
+        return self.annotate(
+            viewer_specialty=Subquery(
+                HealthProfile.objects.filter(user_id=user.pk).values("specialty")[:1]
+            )
+        )
+
+
+class MedicalEntryQuerySet(SpecialtyScopedQuerySet):
+    def search(self, text):
+        """
+        Busca textual em português sobre descrição e notas, anotando `rank`
+        """
+        query = SearchQuery(text, config="portuguese", search_type="websearch")
+        # ts_rank returns real; as double it round-trips exactly through the cursor
+        rank = Cast(SearchRank(F("search_vector"), query), models.FloatField())
+        return self.filter(search_vector=query).annotate(rank=rank)
+
+    def activity_counts(self):
+        """
+        Contagens do dashboard direto das entradas (mês no fuso atual)
+        """
+        return activity_counts(
+            self.values(
+                g_specialty=F("specialty"),
+                g_healthpro=F("healthpro_id"),
+                g_first_name=F("healthpro__first_name"),
+                g_last_name=F("healthpro__last_name"),
+                g_month=TruncMonth("entry_date"),
+                g_count=Value(1),
+            )
+        )
+
+
+class MedicalEntryManager(models.Manager.from_queryset(MedicalEntryQuerySet)):
+    """
+    Só entradas ativas: as excluídas (soft delete) ficam de fora, como nos
+    índices parciais. MedicalEntry.all_with_deleted inclui as excluídas.
+    """
+
+    include_deleted = False
+
+    def get_queryset(self):
+        # The serializers always nest student and healthpro; the search
+        # vector is only used inside the database
+        queryset = (
+            super()
+            .get_queryset()
+            .select_related("student", "healthpro")
+            .defer("search_vector")
+        )
+        if self.include_deleted:
+            return queryset
+        return queryset.filter(deleted=False)
+
+
+class MedicalEntryWithDeletedManager(MedicalEntryManager):
+    include_deleted = True
+
+
 class MedicalEntry(models.Model):
     id = models.AutoField(primary_key=True, editable=False, unique=True)
     student = models.ForeignKey(
@@ -22,6 +166,21 @@ class MedicalEntry(models.Model):
         db_comment="Additional notes",
         help_text="Observações adicionais",
     )
+    search_vector = models.GeneratedField(
+        expression=SearchVector("description", weight="A", config="portuguese")
+        + SearchVector("notes", weight="B", config="portuguese"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        db_comment="Portuguese full-text vector over description and notes",
+    )
+    specialty = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        editable=False,
+        db_comment="Author specialty when the entry was written",
+        help_text="Especialidade do profissional no momento do registro",
+    )
 
     deleted = models.BooleanField(default=False)
     deleted_by = models.ForeignKey(
@@ -29,6 +188,71 @@ class MedicalEntry(models.Model):
     )
     delete_date = models.DateTimeField(null=True, blank=True)
     delete_reason = models.CharField(max_length=200, null=True, blank=True)
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_comment="Last change (creation or soft delete), used by delta sync",
+    )
+
+    # The first manager is the default one (admin, related managers)
+    objects = MedicalEntryManager()
+    all_with_deleted = MedicalEntryWithDeletedManager()
+
+    class Meta:
+        indexes = [
+            # Listagem geral e cursor: WHERE NOT deleted ORDER BY entry_date DESC, id DESC
+            models.Index(
+                fields=["-entry_date", "-id"],
+                condition=Q(deleted=False),
+                name="medentry_active_date_idx",
+            ),
+            # Linha do tempo de um estudante
+            models.Index(
+                fields=["student", "-entry_date", "-id"],
+                condition=Q(deleted=False),
+                name="medentry_active_student_idx",
+            ),
+            # Listagem do health_prof, filtrada pela especialidade
+            models.Index(
+                fields=["specialty", "-entry_date", "-id"],
+                condition=Q(deleted=False),
+                name="medentry_active_specialty_idx",
+            ),
+            # Busca textual (q=)
+            GinIndex(fields=["search_vector"], name="medentry_search_vector_idx"),
+            # Intervalos de datas com as excluídas (all_with_deleted)
+            models.Index(fields=["entry_date"], name="medentry_entry_date_idx"),
+            # Sincronização incremental: WHERE (updated_at, id) > cursor
+            models.Index(fields=["updated_at", "id"], name="medentry_updated_idx"),
+            # Arquivamento: excluídas mais antigas que a retenção
+            models.Index(
+                fields=["delete_date"],
+                condition=Q(deleted=True),
+                name="medentry_deleted_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The specialty is copied once: later profile changes keep old entries
+        # under the specialty they were written in
+        if self._state.adding and not self.specialty and self.healthpro_id:
+            profile = getattr(self.healthpro, "health_profile", None)
+            if profile is not None:
+                self.specialty = profile.specialty
+        with transaction.atomic(using=kwargs.get("using")):
+            previous = None
+            if not self._state.adding:
+                # Locked until the deltas are applied: two concurrent soft
+                # deletes would otherwise both read "active" and both apply -1
+                previous = (
+                    MedicalEntry.all_with_deleted.filter(pk=self.pk)
+                    .select_for_update(of=("self",))
+                    .values(*MonthlyEntryRollup.SOURCE_FIELDS)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            MonthlyEntryRollup.objects.record_change(previous, self)
+        # Creating and soft deleting both go through here
+        invalidate_entry_caches(self.student_id)
 
     def soft_delete(self, user, reason):
         self.deleted = True
@@ -39,3 +263,260 @@ class MedicalEntry(models.Model):
 
     def __str__(self):
         return self.entry_date
+
+
+class MonthlyEntryRollupQuerySet(SpecialtyScopedQuerySet):
+    def activity_counts(self):
+        """
+        Mesmas contagens de MedicalEntryQuerySet.activity_counts, a partir do
+        rollup (sem ler as entradas)
+        """
+        return activity_counts(
+            self.filter(count__gt=0).values(
+                g_specialty=F("specialty"),
+                g_healthpro=F("healthpro_id"),
+                g_first_name=F("healthpro__first_name"),
+                g_last_name=F("healthpro__last_name"),
+                g_month=F("month"),
+                g_count=F("count"),
+            )
+        )
+
+
+class MonthlyEntryRollupManager(
+    models.Manager.from_queryset(MonthlyEntryRollupQuerySet)
+):
+    def source_counts(self):
+        """
+        Contagens calculadas das entradas, no formato do rollup
+        """
+        return (
+            MedicalEntry.objects.order_by()
+            .values(
+                r_month=TruncMonth("entry_date", output_field=models.DateField()),
+                r_specialty=F("specialty"),
+                r_healthpro=F("healthpro_id"),
+                r_student=F("student_id"),
+            )
+            .annotate(r_count=Count("pk"))
+        )
+
+    def record_change(self, previous, current):
+        """
+        Aplica uma gravação de entrada: `previous` é o estado antes (valores
+        de SOURCE_FIELDS, None na criação) e `current` a entrada salva
+        """
+        deltas = Counter()
+        if previous is not None and not previous["deleted"]:
+            deltas[self.model.key_of(previous)] -= 1
+        if not current.deleted:
+            deltas[self.model.key_of(vars(current))] += 1
+        self.apply_deltas(deltas)
+
+    def record_entries(self, entries):
+        """
+        Para entradas criadas sem save() (bulk_create)
+        """
+        self.apply_deltas(
+            Counter(self.model.key_of(vars(e)) for e in entries if not e.deleted)
+        )
+
+    def apply_deltas(self, deltas):
+        """
+        Soma `deltas` ({(mês, especialidade, profissional, estudante): n}) em
+        um único INSERT ... ON CONFLICT DO UPDATE
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        rows = ", ".join(["(%s, %s, %s, %s, %s)"] * len(deltas))
+        params = [value for key, delta in deltas.items() for value in (*key, delta)]
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.model._meta.db_table} AS rollup
+                    (month, specialty, healthpro_id, student_id, count)
+                VALUES {rows}
+                ON CONFLICT ON CONSTRAINT {self.model.KEY_CONSTRAINT}
+                DO UPDATE SET count = rollup.count + EXCLUDED.count
+                """,
+                params,
+            )
+
+    def rebuild(self):
+        """
+        Recalcula o rollup inteiro a partir das entradas. O lock bloqueia as
+        gravações incrementais até o commit, para nenhuma se perder no meio.
+        """
+        table = self.model._meta.db_table
+        sql, params = self.source_counts().query.sql_with_params()
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table}
+                        (month, specialty, healthpro_id, student_id, count)
+                    {sql}
+                    """,
+                    params,
+                )
+                return cursor.rowcount
+
+    def verify(self):
+        """
+        Chaves em que o rollup difere das entradas:
+        [(mês, especialidade, profissional, estudante, esperado, no rollup)]
+        """
+        table = self.model._meta.db_table
+        sql, params = self.source_counts().query.sql_with_params()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT COALESCE(e.month::date, r.month),
+                       COALESCE(e.specialty, r.specialty),
+                       COALESCE(e.healthpro_id, r.healthpro_id),
+                       COALESCE(e.student_id, r.student_id),
+                       COALESCE(e.count, 0), COALESCE(r.count, 0)
+                FROM ({sql}) AS e (month, specialty, healthpro_id, student_id, count)
+                FULL OUTER JOIN (SELECT * FROM {table} WHERE count <> 0) AS r
+                    ON r.month = e.month::date
+                    AND r.specialty IS NOT DISTINCT FROM e.specialty
+                    AND r.healthpro_id = e.healthpro_id
+                    AND r.student_id = e.student_id
+                WHERE e.count IS DISTINCT FROM r.count
+                ORDER BY 1, 2, 3, 4
+                """,
+                params,
+            )
+            return cursor.fetchall()
+
+
+class MonthlyEntryRollup(models.Model):
+    """
+    Entradas ativas por mês (no fuso local), especialidade, profissional e
+    estudante. Mantido incrementalmente por MedicalEntry.save() e pelos
+    caminhos com bulk_create; `rebuild_entry_rollup` recalcula e confere.
+    """
+
+    SOURCE_FIELDS = (
+        "entry_date",
+        "specialty",
+        "healthpro_id",
+        "student_id",
+        "deleted",
+    )
+    KEY_CONSTRAINT = "medentry_rollup_key"
+
+    month = models.DateField(db_comment="First day of the month, local time")
+    specialty = models.CharField(max_length=100, null=True, blank=True)
+    healthpro = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="+")
+    count = models.IntegerField(default=0, db_comment="Active (not deleted) entries")
+
+    objects = MonthlyEntryRollupManager()
+
+    class Meta:
+        constraints = [
+            # Also the ON CONFLICT target; entries without specialty need
+            # NULLS NOT DISTINCT to share a row
+            models.UniqueConstraint(
+                fields=["month", "specialty", "healthpro", "student"],
+                name="medentry_rollup_key",
+                nulls_distinct=False,
+            ),
+        ]
+
+    @staticmethod
+    def key_of(state):
+        return (
+            timezone.localtime(state["entry_date"]).date().replace(day=1),
+            state["specialty"],
+            state["healthpro_id"],
+            state["student_id"],
+        )
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.specialty}: {self.count}"
+
+
+class ArchivedMedicalEntryManager(models.Manager):
+    def archive_batch(self, cutoff, batch_size):
+        """
+        Move até `batch_size` entradas excluídas antes de `cutoff` para o
+        arquivo, em uma transação (DELETE ... RETURNING alimenta o INSERT).
+        Retorna quantas foram movidas.
+        """
+        source = MedicalEntry._meta.db_table
+        columns = ", ".join(
+            self.model._meta.get_field(name).column
+            for name in self.model.COPIED_FIELDS
+        )
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                # SKIP LOCKED lets a second run (or a slow batch) not wait on rows
+                # someone else is already moving
+                cursor.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {source}
+                        WHERE id IN (
+                            SELECT id FROM {source}
+                            WHERE deleted AND delete_date < %s
+                            ORDER BY delete_date
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING {columns}
+                    )
+                    INSERT INTO {self.model._meta.db_table} ({columns})
+                    SELECT {columns} FROM moved
+                    """,
+                    [cutoff, batch_size],
+                )
+                return cursor.rowcount
+
+
+class ArchivedMedicalEntry(models.Model):
+    """
+    Entradas excluídas há mais tempo que a retenção, movidas para fora da
+    tabela principal por `archive_deleted_entries`. Guardam o id original e
+    quem excluiu, quando e por quê.
+    """
+
+    COPIED_FIELDS = (
+        "id",
+        "student",
+        "healthpro",
+        "entry_date",
+        "description",
+        "notes",
+        "specialty",
+        "deleted_by",
+        "delete_date",
+        "delete_reason",
+        "updated_at",
+    )
+
+    id = models.IntegerField(primary_key=True, db_comment="Original MedicalEntry id")
+    student = models.ForeignKey(
+        Student, on_delete=models.CASCADE, related_name="archived_medical_entries"
+    )
+    healthpro = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    entry_date = models.DateTimeField()
+    description = models.CharField(max_length=500)
+    notes = models.CharField(max_length=500, null=True)
+    specialty = models.CharField(max_length=100, null=True, blank=True)
+    deleted_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    delete_date = models.DateTimeField(null=True, blank=True)
+    delete_reason = models.CharField(max_length=200, null=True, blank=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(db_default=Now())
+
+    objects = ArchivedMedicalEntryManager()
+
+    def __str__(self):
+        return f"{self.id} (arquivada em {self.archived_at:%Y-%m-%d})"
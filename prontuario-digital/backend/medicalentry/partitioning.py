@@ -0,0 +1,267 @@
+"""
+Particionamento declarativo (opcional) da tabela de entradas por entry_date,
+mensal ou anual. Nada aqui roda sozinho: `partition_medical_entries` converte
+a tabela atual e `create_entry_partitions` cria as partições futuras.
+
+Os limites das partições são a meia-noite no fuso atual, os mesmos usados
+pelos relatórios, então um mês do relatório mensal cai em uma só partição.
+"""
+
+import json
+import re
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import MedicalEntry
+
+TABLE = MedicalEntry._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+INTERVALS = ("month", "year")
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})(?:_(\d{{2}}))?$")
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def period_start(day, interval):
+    return day.replace(month=1 if interval == "year" else day.month, day=1)
+
+
+def next_period(start, interval):
+    if interval == "year" or start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start, interval):
+    suffix = f"{start:%Y}" if interval == "year" else f"{start:%Y_%m}"
+    return f"{TABLE}_p{suffix}"
+
+
+def _bound(day):
+    # Literal timestamptz at local midnight (DDL does not take parameters)
+    return "'%s'" % timezone.make_aware(datetime(day.year, day.month, day.day))
+
+
+def _columns():
+    # The generated search vector is recomputed on insert
+    return ", ".join(
+        field.column
+        for field in MedicalEntry._meta.concrete_fields
+        if not getattr(field, "generated", False)
+    )
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass
+        )
+        """,
+        [TABLE],
+    )
+    return cursor.fetchone()[0]
+
+
+def partitions(cursor):
+    cursor.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = %s::regclass
+        """,
+        [TABLE],
+    )
+    return {name for (name,) in cursor.fetchall()}
+
+
+def detect_interval(names):
+    """
+    Intervalo em uso, pelo nome das partições (_pAAAA ou _pAAAA_MM)
+    """
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            return "month" if match.group(2) else "year"
+    return None
+
+
+def create_partitions(cursor, first, last, interval):
+    """
+    Cria as partições de `first` até `last` (datas) que ainda não existem.
+    Linhas que já caíram na partição default para um desses períodos são
+    movidas para a nova partição. Retorna os nomes criados.
+    """
+    existing = partitions(cursor)
+    created = []
+    start = period_start(first, interval)
+    while start <= last:
+        end = next_period(start, interval)
+        name = partition_name(start, interval)
+        if name not in existing:
+            _create_partition(cursor, name, start, end, DEFAULT_PARTITION in existing)
+            created.append(name)
+        start = end
+    return created
+
+
+def _create_partition(cursor, name, start, end, has_default):
+    lower, upper = _bound(start), _bound(end)
+    in_range = f"entry_date >= {lower} AND entry_date < {upper}"
+    if has_default:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"
+        )
+    if not has_default or not cursor.fetchone()[0]:
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ({lower}) TO ({upper})"
+        )
+        return
+
+    # PostgreSQL refuses a range the default partition already holds rows
+    # for: move them to a standalone table first, then attach it
+    columns = _columns()
+    cursor.execute(
+        f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS "
+        f"INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+    )
+    cursor.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING {columns}
+        )
+        INSERT INTO {name} ({columns}) SELECT {columns} FROM moved
+        """
+    )
+    cursor.execute(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ({lower}) TO ({upper})"
+    )
+
+
+def convert_to_partitioned(interval, ahead):
+    """
+    Troca a tabela atual por uma tabela particionada com os mesmos dados,
+    índices e chaves estrangeiras, em uma transação. A chave primária passa a
+    ser (id, entry_date), exigência do PostgreSQL; o id continua vindo da
+    mesma sequência de identidade, então segue único.
+    """
+    if interval not in INTERVALS:
+        raise PartitioningError(f"Unknown interval: {interval}")
+
+    new_table = f"{TABLE}_partitioned"
+    columns = _columns()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            raise PartitioningError(f"{TABLE} is already partitioned")
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE confrelid = %s::regclass",
+            [TABLE],
+        )
+        referencing = [name for (name,) in cursor.fetchall()]
+        if referencing:
+            raise PartitioningError(
+                f"Foreign keys reference {TABLE}: {', '.join(referencing)}"
+            )
+
+        # Pending deferred FK checks would block the DROP TABLE below
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            """,
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(indexrelid) FROM pg_index
+            WHERE indrelid = %s::regclass AND NOT indisprimary
+            """,
+            [TABLE],
+        )
+        indexes = [definition for (definition,) in cursor.fetchall()]
+
+        cursor.execute(
+            f"""
+            CREATE TABLE {new_table} (
+                LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+                INCLUDING GENERATED INCLUDING IDENTITY INCLUDING COMMENTS
+            ) PARTITION BY RANGE (entry_date)
+            """
+        )
+        cursor.execute(
+            f"ALTER TABLE {new_table} ADD CONSTRAINT {new_table}_pkey "
+            f"PRIMARY KEY (id, entry_date)"
+        )
+
+        cursor.execute(f"SELECT MIN(entry_date) FROM {TABLE}")
+        oldest = cursor.fetchone()[0]
+        today = timezone.localdate()
+        first = timezone.localdate(oldest) if oldest else today
+        last = today
+        for _ in range(ahead):
+            last = next_period(period_start(last, interval), interval)
+
+        # Swap the names first so partitions attach to the final table name
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned")
+        cursor.execute(f"ALTER TABLE {new_table} RENAME TO {TABLE}")
+        create_partitions(cursor, first, last, interval)
+        cursor.execute(
+            f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"
+        )
+
+        cursor.execute(
+            f"INSERT INTO {TABLE} ({columns}) "
+            f"SELECT {columns} FROM {TABLE}_unpartitioned"
+        )
+        cursor.execute(
+            f"""
+            SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'),
+                          COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+            FROM {TABLE}
+            """
+        )
+        cursor.execute(f"DROP TABLE {TABLE}_unpartitioned")
+
+        # Back to the names Django and the migrations know
+        cursor.execute(
+            f"ALTER TABLE {TABLE} RENAME CONSTRAINT {new_table}_pkey TO {TABLE}_pkey"
+        )
+        cursor.execute(f"ALTER SEQUENCE {new_table}_id_seq RENAME TO {TABLE}_id_seq")
+        for definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+        cursor.execute(f"ANALYZE {TABLE}")
+
+        return sorted(partitions(cursor))
+
+
+def scanned_partitions(queryset):
+    """
+    Partições que o plano de `queryset` lê (as demais foram podadas)
+    """
+    plan = json.loads(queryset.explain(format="json"))
+    names = set()
+
+    def walk(node):
+        if "Relation Name" in node:
+            names.add(node["Relation Name"])
+        for child in node.get("Plans", ()):
+            walk(child)
+
+    for item in plan:
+        walk(item["Plan"])
+    with connection.cursor() as cursor:
+        # Joined tables (student, healthpro) show up in the plan too
+        return names & partitions(cursor)
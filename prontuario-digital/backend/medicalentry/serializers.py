@@ -2,9 +2,10 @@ from rest_framework import serializers
 from .models import MedicalEntry
 from authentication.serializers import UserNestedSerializer
 from students.serializers import StudentNestedSerializer
+from utils.serializers import SparseFieldsMixin
 
 
-class MedicalEntrySerializer(serializers.ModelSerializer):
+class MedicalEntrySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = StudentNestedSerializer(read_only=True)
     healthpro = UserNestedSerializer(read_only=True)
 
@@ -17,20 +18,24 @@ class MedicalEntrySerializer(serializers.ModelSerializer):
             "entry_date",
             "description",
             "notes",
+            "specialty",
             "deleted",
             "deleted_by",
             "delete_date",
             "delete_reason",
+            "updated_at",
         ]
         read_only_fields = [
             "id",
             "student",
             "healthpro",
             "entry_date",
+            "specialty",
             "deleted",
             "deleted_by",
             "delete_date",
             "delete_reason",
+            "updated_at",
         ]
 
     def create(self, validated_data):
@@ -1,10 +1,38 @@
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.urls import reverse
-from medicalentry.models import MedicalEntry
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from medicalentry.models import (
+    ArchivedMedicalEntry,
+    MedicalEntry,
+    MonthlyEntryRollup,
+)
+from medicalentry.cache import timeline_cache_stats, timeline_version
+from medicalentry.partitioning import (
+    TABLE,
+    create_partitions,
+    detect_interval,
+    next_period,
+    partition_name,
+    partitions,
+    period_start,
+)
 from students.models import Student
 from authentication.models import User, HealthProfile
-from datetime import date
+from utils.pagination import KeysetPagination
+from django.utils import timezone
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+from io import StringIO
+import json
+import random
+import threading
+import time
+import uuid
 
 
 class MedicalEntryTests(APITestCase):
@@ -263,7 +291,9 @@ class MedicalEntryDetailTests(APITestCase):
         payload = {"delete_reason": "Entry is obsolete."}
         response = self.client.delete(url, payload, format="json")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        entry = MedicalEntry.objects.get(pk=self.medical_entry_psychologist.pk)
+        entry = MedicalEntry.all_with_deleted.get(
+            pk=self.medical_entry_psychologist.pk
+        )
         self.assertTrue(entry.deleted)
         self.assertEqual(entry.delete_reason, "Entry is obsolete.")
         self.assertEqual(entry.deleted_by, self.admin_user)
@@ -274,7 +304,9 @@ class MedicalEntryDetailTests(APITestCase):
         payload = {"delete_reason": "Correction needed."}
         response = self.client.delete(url, payload, format="json")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        entry = MedicalEntry.objects.get(pk=self.medical_entry_psychologist.pk)
+        entry = MedicalEntry.all_with_deleted.get(
+            pk=self.medical_entry_psychologist.pk
+        )
         self.assertTrue(entry.deleted)
         self.assertEqual(entry.delete_reason, "Correction needed.")
         self.assertEqual(entry.deleted_by, self.health_prof_user_psychologist)
@@ -303,3 +335,1558 @@ class MedicalEntryDetailTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data["detail"], "Medical entry not found")
+
+
+    def test_get_medical_entry_as_health_prof_is_one_query(self):
+        url = reverse("medical_entry_detail", args=[self.medical_entry_psychologist.pk])
+        for user, expected in [
+            (self.health_prof_user_psychologist, status.HTTP_200_OK),
+            (self.health_prof_user_physiotherapist, status.HTTP_403_FORBIDDEN),
+        ]:
+            # Fresh instance: no health_profile cached on the user
+            self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, expected)
+        self.assertEqual(
+            response.data["detail"], "You can only view entries from your specialty"
+        )
+
+    def test_get_medical_entry_without_health_profile_forbidden(self):
+        user = User.objects.create_user(
+            username="noprofile",
+            email="noprofile@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        self.client.force_authenticate(user=user)
+        url = reverse("medical_entry_detail", args=[self.medical_entry_psychologist.pk])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data["detail"], "Health profile not found")
+
+
+class MedicalEntryPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+            first_name="Admin",
+            last_name="User",
+        )
+
+        cls.health_prof_user = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Psycho",
+            last_name="Prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.health_prof_user,
+            specialty="psychologist",
+            council_number="12345",
+        )
+
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2000, 1, 1),
+            gender="M",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+
+        # Sete entradas, duas delas com a mesma data para exercitar o desempate por id
+        base = timezone.now()
+        cls.entries = []
+        for i in range(7):
+            entry = MedicalEntry.objects.create(
+                student=cls.student,
+                healthpro=cls.health_prof_user,
+                description=f"Session {i}",
+            )
+            entry_date = base - timedelta(days=min(i, 5))
+            MedicalEntry.objects.filter(pk=entry.pk).update(entry_date=entry_date)
+            cls.entries.append(entry)
+
+    def _walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            body = response.data
+            ids.extend(item["id"] for item in body.get("results", body.get("entries")))
+            url = body["next"]
+            pages += 1
+        return ids, pages
+
+    def test_list_without_pagination_params_keeps_plain_list(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse("medical_entry_list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_list_cursor_walk_returns_every_entry_once_in_order(self):
+        self.client.force_authenticate(user=self.admin_user)
+        ids, pages = self._walk(f"{reverse('medical_entry_list')}?page_size=2")
+
+        expected = list(
+            MedicalEntry.objects.order_by("-entry_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_by_student_cursor_walk(self):
+        self.client.force_authenticate(user=self.health_prof_user)
+        url = reverse("medical_entry_by_student", args=[self.student.id])
+        ids, pages = self._walk(f"{url}?page_size=3")
+
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+        self.assertEqual(pages, 3)
+
+    def test_page_size_is_capped(self):
+        self.client.force_authenticate(user=self.admin_user)
+        with patch.object(KeysetPagination, "max_page_size", 5):
+            response = self.client.get(
+                f"{reverse('medical_entry_list')}?page_size=1000"
+            )
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(f"{reverse('medical_entry_list')}?cursor=invalid")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data["detail"], "Invalid cursor")
+
+
+class MedicalEntryQueryCountTests(APITestCase):
+    """
+    O número de queries das listagens não pode crescer com o número de entradas
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+            first_name="Admin",
+            last_name="User",
+        )
+
+        cls.health_prof_user = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Psycho",
+            last_name="Prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.health_prof_user,
+            specialty="psychologist",
+            council_number="12345",
+        )
+
+        cls.students = [
+            Student.objects.create(
+                name=f"Student {i}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1, 1),
+                gender="F",
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city="Test City",
+                state="TS",
+            )
+            for i in range(3)
+        ]
+
+    def _create_entries(self, count):
+        for i in range(count):
+            MedicalEntry.objects.create(
+                student=self.students[i % len(self.students)],
+                healthpro=self.health_prof_user,
+                description=f"Session {i}",
+            )
+
+    def _count_queries(self, user, url):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        url = reverse("medical_entry_list")
+        self._create_entries(2)
+        admin_small = self._count_queries(self.admin_user, url)
+        prof_small = self._count_queries(self.health_prof_user, url)
+
+        self._create_entries(20)
+        self.assertEqual(self._count_queries(self.admin_user, url), admin_small)
+        self.assertEqual(self._count_queries(self.health_prof_user, url), prof_small)
+        self.assertEqual(admin_small, 1)
+
+    def test_by_student_query_count_is_constant(self):
+        url = reverse("medical_entry_by_student", args=[self.students[0].id])
+        self._create_entries(3)
+        small = self._count_queries(self.health_prof_user, url)
+
+        self._create_entries(30)
+        self.assertEqual(self._count_queries(self.health_prof_user, url), small)
+
+    def test_detail_does_not_query_nested_objects(self):
+        self._create_entries(1)
+        entry = MedicalEntry.objects.get()
+        url = reverse("medical_entry_detail", args=[entry.pk])
+
+        self.client.force_authenticate(user=self.admin_user)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class MedicalEntryIndexUsageTests(APITestCase):
+    """
+    EXPLAIN sobre uma base semeada: o planner deve usar os índices parciais
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.healthpros = []
+        specialties = ["psychologist", "physiotherapist"]
+        for i in range(20):
+            user = User.objects.create_user(
+                username=f"prof{i}",
+                email=f"prof{i}@example.com",
+                password="testpassword123",
+                role="health_prof",
+                first_name="Prof",
+                last_name=str(i),
+            )
+            HealthProfile.objects.create(
+                user=user, specialty=specialties[i % 2], council_number=str(i)
+            )
+            cls.healthpros.append(user)
+
+        cls.students = Student.objects.bulk_create(
+            Student(
+                name=f"Student {i}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1, 1),
+                gender="F",
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city="Test City",
+                state="TS",
+            )
+            for i in range(100)
+        )
+
+        entries = MedicalEntry.objects.bulk_create(
+            MedicalEntry(
+                student=cls.students[i % 100],
+                healthpro=cls.healthpros[i % 20],
+                # speech_therapist fica com 1% das entradas, como uma especialidade rara
+                specialty="speech_therapist" if i % 100 == 0 else specialties[i % 2],
+                description=f"Session {i}",
+                deleted=i % 7 == 0,
+            )
+            for i in range(5000)
+        )
+        # Datas embaralhadas: a ordem física da tabela não acompanha entry_date
+        base = timezone.now()
+        offsets = list(range(len(entries)))
+        random.Random(0).shuffle(offsets)
+        for entry, offset in zip(entries, offsets):
+            entry.entry_date = base - timedelta(hours=offset)
+        MedicalEntry.objects.bulk_update(entries, ["entry_date"], batch_size=1000)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE medicalentry_medicalentry")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_list_uses_active_date_index(self):
+        queryset = MedicalEntry.objects.filter(deleted=False).order_by(
+            "-entry_date", "-id"
+        )[:50]
+        self.assertUsesIndex(queryset, "medentry_active_date_idx")
+
+    def test_student_timeline_uses_active_student_index(self):
+        queryset = MedicalEntry.objects.filter(
+            student=self.students[7], deleted=False
+        ).order_by("-entry_date", "-id")
+        self.assertUsesIndex(queryset, "medentry_active_student_idx")
+
+    def test_specialty_filter_uses_active_specialty_index(self):
+        queryset = MedicalEntry.objects.filter(
+            specialty="speech_therapist", deleted=False
+        ).order_by("-entry_date", "-id")[:50]
+        self.assertUsesIndex(queryset, "medentry_active_specialty_idx")
+
+    def test_date_range_uses_entry_date_index(self):
+        end = timezone.now() - timedelta(days=30)
+        queryset = MedicalEntry.all_with_deleted.filter(
+            entry_date__gte=end - timedelta(days=2), entry_date__lt=end
+        ).order_by("entry_date")
+        self.assertUsesIndex(queryset, "medentry_entry_date_idx")
+
+    def test_active_date_range_uses_active_date_index(self):
+        # The default manager already leaves deleted entries out
+        end = timezone.now() - timedelta(days=30)
+        queryset = MedicalEntry.objects.filter(
+            entry_date__gte=end - timedelta(days=2), entry_date__lt=end
+        ).order_by("entry_date")
+        self.assertUsesIndex(queryset, "medentry_active_date_idx")
+
+
+class MedicalEntrySpecialtyTests(APITestCase):
+    """
+    A especialidade é gravada na entrada no momento da criação
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.health_prof_user = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Psycho",
+            last_name="Prof",
+        )
+        cls.profile = HealthProfile.objects.create(
+            user=cls.health_prof_user,
+            specialty="psychologist",
+            council_number="12345",
+        )
+
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2000, 1, 1),
+            gender="M",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+
+    def test_create_stores_author_specialty(self):
+        self.client.force_authenticate(user=self.health_prof_user)
+        response = self.client.post(
+            reverse("medical_entry_list"),
+            {"student_id": str(self.student.id), "description": "Session"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["specialty"], "psychologist")
+        entry = MedicalEntry.objects.get(pk=response.data["id"])
+        self.assertEqual(entry.specialty, "psychologist")
+
+    def test_model_save_copies_profile_specialty(self):
+        entry = MedicalEntry.objects.create(
+            student=self.student,
+            healthpro=self.health_prof_user,
+            description="Session",
+        )
+        self.assertEqual(entry.specialty, "psychologist")
+
+    def test_profile_change_does_not_rewrite_existing_entries(self):
+        entry = MedicalEntry.objects.create(
+            student=self.student,
+            healthpro=self.health_prof_user,
+            description="Old session",
+        )
+
+        self.profile.specialty = "physiotherapist"
+        self.profile.save()
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.specialty, "psychologist")
+
+        user = User.objects.get(pk=self.health_prof_user.pk)
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse("medical_entry_list"))
+        self.assertEqual(response.data, [])
+
+        response = self.client.get(reverse("medical_entry_detail", args=[entry.pk]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_visibility_filter_does_not_join_health_profile(self):
+        queryset = MedicalEntry.objects.visible_to(self.health_prof_user)
+        self.assertNotIn("authentication_healthprofile", str(queryset.query))
+
+
+class MedicalEntrySearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+            first_name="Admin",
+            last_name="User",
+        )
+
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Psycho",
+            last_name="Prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+
+        cls.physiotherapist = User.objects.create_user(
+            username="physio",
+            email="physio@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Physio",
+            last_name="Prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.physiotherapist, specialty="physiotherapist", council_number="2"
+        )
+
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2000, 1, 1),
+            gender="M",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+
+        def create(healthpro, description, notes=None):
+            return MedicalEntry.objects.create(
+                student=cls.student,
+                healthpro=healthpro,
+                description=description,
+                notes=notes,
+            )
+
+        cls.in_notes = create(
+            cls.psychologist, "Sessão de acompanhamento", "Relata ansiedade na escola"
+        )
+        cls.in_description = create(
+            cls.psychologist, "Crise de ansiedade antes da prova", "Sem intercorrências"
+        )
+        cls.other_specialty = create(
+            cls.physiotherapist, "Dor lombar e ansiedade", "Exercícios de postura"
+        )
+        cls.deleted = create(cls.psychologist, "Ansiedade", "Entrada removida")
+        cls.deleted.soft_delete(cls.psychologist, "Duplicada")
+        create(cls.psychologist, "Treino de leitura")
+
+    def _search(self, user, query, extra=""):
+        self.client.force_authenticate(user=user)
+        return self.client.get(f"{reverse('medical_entry_list')}?q={query}{extra}")
+
+    def test_search_matches_description_and_notes_with_stemming(self):
+        response = self._search(self.admin_user, "ansiedades")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in response.data]
+        self.assertCountEqual(
+            ids, [self.in_notes.id, self.in_description.id, self.other_specialty.id]
+        )
+
+    def test_search_ranks_description_above_notes(self):
+        response = self._search(self.psychologist, "ansiedade")
+        ids = [item["id"] for item in response.data]
+        self.assertEqual(ids, [self.in_description.id, self.in_notes.id])
+
+    def test_search_keeps_specialty_and_deleted_rules(self):
+        response = self._search(self.physiotherapist, "ansiedade")
+        ids = [item["id"] for item in response.data]
+        self.assertEqual(ids, [self.other_specialty.id])
+
+    def test_search_with_cursor_pagination(self):
+        response = self._search(self.admin_user, "ansiedade", "&page_size=1")
+        ids = [response.data["results"][0]["id"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            ids.extend(item["id"] for item in response.data["results"])
+
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(len(set(ids)), 3)
+
+
+class MedicalEntryConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.physiotherapist = User.objects.create_user(
+            username="physio",
+            email="physio@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.physiotherapist, specialty="physiotherapist", council_number="2"
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        cls.entry = MedicalEntry.objects.create(
+            student=cls.student, healthpro=cls.psychologist, description="Sessão"
+        )
+        cls.url = reverse("medical_entry_by_student", args=[cls.student.id])
+
+    def _get(self, user, **headers):
+        self.client.force_authenticate(user=user)
+        return self.client.get(self.url, headers=headers)
+
+    def test_etag_round_trip_returns_304(self):
+        response = self._get(self.psychologist)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+        with patch("medicalentry.views.MedicalEntrySerializer") as serializer:
+            cached = self._get(self.psychologist, if_none_match=response["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached["ETag"], response["ETag"])
+        self.assertFalse(cached.content)
+        serializer.assert_not_called()
+
+        # The timeline depends on the viewer's specialty, which a date alone
+        # can't validate
+        cached = self._get(
+            self.psychologist, if_modified_since=response["Last-Modified"]
+        )
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+
+    def test_etag_changes_on_create_and_delete(self):
+        etag = self._get(self.psychologist)["ETag"]
+
+        MedicalEntry.objects.create(
+            student=self.student, healthpro=self.psychologist, description="Nova"
+        )
+        response = self._get(self.psychologist, if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["entries"]), 2)
+
+        etag = response["ETag"]
+        self.entry.soft_delete(user=self.psychologist, reason="Erro")
+        response = self._get(self.psychologist, if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["entries"]), 1)
+
+    def test_etag_changes_when_author_is_renamed(self):
+        etag = self._get(self.psychologist)["ETag"]
+        self.psychologist.first_name = "Renomeada"
+        self.psychologist.save()
+        response = self._get(self.psychologist, if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["entries"][0]["healthpro"]["first_name"], "Renomeada"
+        )
+
+    def test_etag_is_scoped_to_role_and_specialty(self):
+        etags = {
+            self._get(user)["ETag"]
+            for user in (self.admin_user, self.psychologist, self.physiotherapist)
+        }
+        self.assertEqual(len(etags), 3)
+
+        psychologist_etag = self._get(self.psychologist)["ETag"]
+        response = self._get(self.physiotherapist, if_none_match=psychologist_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_pagination_params(self):
+        self.client.force_authenticate(user=self.admin_user)
+        full = self.client.get(self.url)["ETag"]
+        paged = self.client.get(self.url, {"page_size": 1})["ETag"]
+        self.assertNotEqual(full, paged)
+
+
+class MedicalEntryTimelineCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.physiotherapist = User.objects.create_user(
+            username="physio",
+            email="physio@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.physiotherapist, specialty="physiotherapist", council_number="2"
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        cls.url = reverse("medical_entry_by_student", args=[cls.student.id])
+
+    def setUp(self):
+        cache.clear()
+        self.entry = MedicalEntry.objects.create(
+            student=self.student, healthpro=self.psychologist, description="Sessão"
+        )
+
+    def _get(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_second_read_is_served_from_cache(self):
+        self._get(self.psychologist)
+        with patch("utils.serializers.ValuesSerializer.serialize") as serialize:
+            response = self._get(self.psychologist)
+        serialize.assert_not_called()
+        self.assertEqual(len(response.data["entries"]), 1)
+        self.assertEqual(timeline_cache_stats(), {"hits": 1, "misses": 1})
+
+    def test_cache_is_scoped_by_specialty(self):
+        self._get(self.psychologist)
+        response = self._get(self.physiotherapist)
+        self.assertEqual(response.data["entries"], [])
+        self.assertEqual(timeline_cache_stats(), {"hits": 0, "misses": 2})
+
+    def test_create_bumps_version(self):
+        version = timeline_version(self.student.pk)
+        self._get(self.psychologist)
+
+        self.client.force_authenticate(user=self.psychologist)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(
+                reverse("medical_entry_list"),
+                {"student_id": str(self.student.id), "description": "Nova"},
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(timeline_version(self.student.pk), version + 2)
+
+        response = self._get(self.psychologist)
+        self.assertEqual(len(response.data["entries"]), 2)
+        self.assertEqual(timeline_cache_stats()["hits"], 0)
+
+    def test_soft_delete_bumps_version(self):
+        self._get(self.psychologist)
+        version = timeline_version(self.student.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.soft_delete(user=self.psychologist, reason="Erro")
+        self.assertEqual(timeline_version(self.student.pk), version + 2)
+
+        response = self._get(self.psychologist)
+        self.assertEqual(response.data["entries"], [])
+
+    def test_renamed_author_is_not_served_from_cache(self):
+        self._get(self.psychologist)
+        self.psychologist.last_name = "Renomeada"
+        self.psychologist.save()
+        response = self._get(self.psychologist)
+        self.assertEqual(
+            response.data["entries"][0]["healthpro"]["last_name"], "Renomeada"
+        )
+
+    def test_evicted_version_does_not_reuse_old_keys(self):
+        self._get(self.psychologist)
+        old_version = timeline_version(self.student.pk)
+        cache.delete(f"medentry:timeline:version:{self.student.pk}")
+        self.assertGreater(timeline_version(self.student.pk), old_version)
+
+
+class MedicalEntryBatchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.no_profile = User.objects.create_user(
+            username="noprofile",
+            email="noprofile@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        cls.students = [
+            Student.objects.create(
+                name=f"Student {i}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1, 1),
+                gender="F",
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city="Test City",
+                state="TS",
+            )
+            for i in range(3)
+        ]
+        cls.url = reverse("medical_entry_batch")
+
+    def _post(self, user, entries):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, {"entries": entries}, format="json")
+
+    def _items(self, count):
+        return [
+            {
+                "student_id": str(self.students[i % 3].id),
+                "description": f"Sessão em grupo {i}",
+                "notes": "Participou bem",
+            }
+            for i in range(count)
+        ]
+
+    def test_batch_creates_all_entries(self):
+        response = self._post(self.psychologist, self._items(6))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(MedicalEntry.objects.count(), 6)
+
+        entry = MedicalEntry.objects.get(pk=response.data[0]["id"])
+        self.assertEqual(entry.healthpro, self.psychologist)
+        self.assertEqual(entry.specialty, "psychologist")
+        self.assertEqual(response.data[0]["student"]["id"], str(self.students[0].id))
+
+    def test_batch_query_count_does_not_grow_with_size(self):
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as context:
+                response = self._post(self.psychologist, self._items(size))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(30), count_queries(3))
+
+    def test_invalid_item_rejects_whole_batch(self):
+        items = self._items(3)
+        items[1]["description"] = ""
+        items[2]["student_id"] = "00000000-0000-0000-0000-000000000000"
+        items.append({"description": "Sem estudante"})
+        items.append({"student_id": "not-a-uuid", "description": "x"})
+
+        response = self._post(self.psychologist, items)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [error["index"] for error in response.data["errors"]], [1, 2, 3, 4]
+        )
+        self.assertIn("description", response.data["errors"][0]["errors"])
+        self.assertEqual(
+            response.data["errors"][1]["errors"]["student_id"], ["Student not found"]
+        )
+        self.assertEqual(MedicalEntry.objects.count(), 0)
+
+    def test_batch_requires_health_professional(self):
+        response = self._post(self.admin_user, self._items(1))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self._post(self.no_profile, self._items(1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "Health profile not found")
+
+    def test_batch_shape_and_size_limits(self):
+        self.assertEqual(
+            self._post(self.psychologist, []).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self._post(self.psychologist, self._items(201)).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_batch_invalidates_student_timelines(self):
+        versions = [timeline_version(student.pk) for student in self.students]
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(self.psychologist, self._items(2))
+        self.assertGreater(timeline_version(self.students[0].pk), versions[0])
+        self.assertGreater(timeline_version(self.students[1].pk), versions[1])
+        self.assertEqual(timeline_version(self.students[2].pk), versions[2])
+
+
+class MedicalEntrySparseFieldsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Psycho",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        for i in range(5):
+            MedicalEntry.objects.create(
+                student=cls.student,
+                healthpro=cls.psychologist,
+                description=f"Sessão {i}",
+                notes="Anotação longa",
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.psychologist)
+
+    def _get(self, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, context.captured_queries
+
+    def test_fields_without_expand_returns_relation_ids(self):
+        response, queries = self._get(
+            reverse("medical_entry_list"), fields="id,student,description"
+        )
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(
+            response.data[0],
+            {
+                "id": response.data[0]["id"],
+                "student": self.student.id,
+                "description": "Sessão 4",
+            },
+        )
+        sql = queries[-1]["sql"]
+        self.assertNotIn('"notes"', sql)
+        self.assertNotIn("JOIN", sql)
+
+    def test_expand_nests_only_requested_relations(self):
+        response, queries = self._get(
+            reverse("medical_entry_list"),
+            fields="id,student,healthpro",
+            expand="healthpro",
+        )
+        self.assertEqual(response.data[0]["student"], self.student.id)
+        self.assertEqual(response.data[0]["healthpro"]["first_name"], "Psycho")
+        sql = queries[-1]["sql"]
+        self.assertIn('"authentication_user"', sql)
+        self.assertNotIn('"students_student"."name"', sql)
+        self.assertNotIn('"password"', sql)
+
+    def test_cursor_pagination_with_fields_does_not_refetch(self):
+        url = reverse("medical_entry_list")
+        response, queries = self._get(url, fields="description", page_size=2)
+        self.assertEqual(
+            response.data["results"],
+            [{"description": "Sessão 4"}, {"description": "Sessão 3"}],
+        )
+        # entry_date/id stay loaded for the cursor: no per-row refetch
+        self.assertEqual(len(queries), 1)
+
+        cursor = response.data["next"].split("cursor=")[1].split("&")[0]
+        response, _ = self._get(url, fields="description", page_size=2, cursor=cursor)
+        self.assertEqual(response.data["results"][0]["description"], "Sessão 2")
+
+    def test_by_student_supports_fields(self):
+        url = reverse("medical_entry_by_student", args=[self.student.id])
+        full, _ = self._get(url)
+        sparse, queries = self._get(url, fields="id,entry_date")
+        self.assertEqual(set(sparse.data["entries"][0]), {"id", "entry_date"})
+        self.assertEqual(len(full.data["entries"][0]), 12)
+        self.assertNotIn('"description"', queries[-1]["sql"])
+
+    def test_invalid_expand_is_rejected(self):
+        response = self.client.get(
+            reverse("medical_entry_list"), {"expand": "description"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MedicalEntryStreamingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.physiotherapist = User.objects.create_user(
+            username="physio",
+            email="physio@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.physiotherapist, specialty="physiotherapist", council_number="2"
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        for i in range(9):
+            MedicalEntry.objects.create(
+                student=cls.student,
+                healthpro=cls.psychologist if i % 3 else cls.physiotherapist,
+                description=f"Sessão {i}",
+            )
+        cls.url = reverse("medical_entry_list")
+
+    def test_stream_matches_regular_list_and_permissions(self):
+        self.client.force_authenticate(user=self.psychologist)
+        regular = json.loads(self.client.get(self.url).content)
+
+        with patch("utils.streaming.STREAM_CHUNK_SIZE", 4):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.url, {"stream": "1"})
+                body = json.loads(b"".join(response.streaming_content))
+
+        self.assertEqual(body, regular)
+        self.assertEqual(len(body), 6)
+        # Nested student/healthpro come from the join, not one query per row
+        self.assertLessEqual(len(context.captured_queries), 3)
+
+    def test_pagination_takes_precedence_over_stream(self):
+        self.client.force_authenticate(user=self.psychologist)
+        response = self.client.get(self.url, {"stream": "1", "page_size": 2})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class MedicalEntryAggregatesTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Ana",
+            last_name="Souza",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.physiotherapist = User.objects.create_user(
+            username="physio",
+            email="physio@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Bruno",
+            last_name="Lima",
+        )
+        HealthProfile.objects.create(
+            user=cls.physiotherapist, specialty="physiotherapist", council_number="2"
+        )
+        cls.students = [
+            Student.objects.create(
+                name=f"Student {i}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1, 1),
+                gender="F",
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city="Test City",
+                state="TS",
+            )
+            for i in range(2)
+        ]
+
+        def entry(student, healthpro, month, description="Sessão"):
+            obj = MedicalEntry.objects.create(
+                student=student, healthpro=healthpro, description=description
+            )
+            when = timezone.make_aware(datetime(2025, month, 15, 10))
+            MedicalEntry.objects.filter(pk=obj.pk).update(entry_date=when)
+            return obj
+
+        entry(cls.students[0], cls.psychologist, 3, "Ansiedade")
+        entry(cls.students[0], cls.psychologist, 3)
+        entry(cls.students[1], cls.psychologist, 4)
+        entry(cls.students[1], cls.physiotherapist, 4)
+        entry(cls.students[1], cls.physiotherapist, 4).soft_delete(
+            user=cls.physiotherapist, reason="Erro"
+        )
+        # Outside the default period
+        MedicalEntry.objects.filter(
+            pk=entry(cls.students[0], cls.psychologist, 5).pk
+        ).update(entry_date=timezone.make_aware(datetime(2024, 12, 31, 23)))
+        # The dates above were moved with update(), behind the rollup's back
+        MonthlyEntryRollup.objects.rebuild()
+        cls.url = reverse("medical_entry_aggregates")
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url, {"year": 2025, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_counts_per_specialty_professional_and_month(self):
+        data = self._get(self.admin_user)
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(
+            data["by_specialty"],
+            [
+                {"specialty": "psychologist", "count": 3},
+                {"specialty": "physiotherapist", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            data["by_professional"],
+            [
+                {"id": str(self.psychologist.id), "name": "Ana Souza", "count": 3},
+                {"id": str(self.physiotherapist.id), "name": "Bruno Lima", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            data["by_month"],
+            [{"month": "2025-03", "count": 2}, {"month": "2025-04", "count": 2}],
+        )
+
+    def test_health_prof_only_counts_own_specialty(self):
+        data = self._get(self.physiotherapist)
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(
+            data["by_specialty"], [{"specialty": "physiotherapist", "count": 1}]
+        )
+
+    def test_health_prof_without_profile_sees_nothing(self):
+        nurse = User.objects.create_user(
+            username="noprofile",
+            email="noprofile@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        for params in ({}, {"q": "ansiedade"}):
+            data = self._get(nurse, **params)
+            self.assertEqual(data["total"], 0)
+            self.assertEqual(data["by_specialty"], [])
+            self.assertEqual(data["by_professional"], [])
+            self.assertEqual(data["by_month"], [])
+
+    def test_list_filters_apply(self):
+        data = self._get(self.admin_user, student_id=str(self.students[1].id))
+        self.assertEqual(data["total"], 2)
+        data = self._get(self.admin_user, q="ansiedade")
+        self.assertEqual(data["total"], 1)
+        data = self._get(self.admin_user, month=4)
+        self.assertEqual(data["by_month"], [{"month": "2025-04", "count": 2}])
+
+    def test_empty_period(self):
+        data = self._get(self.admin_user, year=2030)
+        self.assertEqual(data["total"], 0)
+        self.assertEqual(data["by_specialty"], [])
+
+    def test_invalid_params(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for params in ({"year": "abc"}, {"month": "13"}, {"year": 2025, "month": 0}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"student_id": str(uuid.uuid4())})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_single_query_then_cached(self):
+        self.client.force_authenticate(user=self.admin_user)
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {"year": 2025})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"year": 2025})
+        self.assertEqual(response.json()["total"], 4)
+
+    def test_new_entry_invalidates_cache(self):
+        self._get(self.admin_user, year=timezone.localdate().year)
+        with self.captureOnCommitCallbacks(execute=True):
+            MedicalEntry.objects.create(
+                student=self.students[0], healthpro=self.psychologist, description="X"
+            )
+        data = self._get(self.admin_user, year=timezone.localdate().year)
+        self.assertEqual(data["total"], 1)
+
+    def test_batch_create_invalidates_cache(self):
+        self._get(self.psychologist, year=timezone.localdate().year)
+        self.client.force_authenticate(user=self.psychologist)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("medical_entry_batch"),
+                {
+                    "entries": [
+                        {"student_id": str(s.id), "description": "Lote"}
+                        for s in self.students
+                    ]
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = self._get(self.psychologist, year=timezone.localdate().year)
+        self.assertEqual(data["total"], 2)
+
+
+class MonthlyEntryRollupTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        # Entries written by someone without a profile have no specialty
+        cls.no_profile = User.objects.create_user(
+            username="noprofile",
+            email="noprofile@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+
+    def _create(self, healthpro=None):
+        return MedicalEntry.objects.create(
+            student=self.student,
+            healthpro=healthpro or self.psychologist,
+            description="Sessão",
+        )
+
+    def _counts(self):
+        return list(
+            MonthlyEntryRollup.objects.order_by("specialty").values_list(
+                "specialty", "count"
+            )
+        )
+
+    def test_creates_are_summed_into_one_row(self):
+        self._create()
+        self._create()
+        self._create(self.no_profile)
+        self._create(self.no_profile)
+        self.assertEqual(self._counts(), [("psychologist", 2), (None, 2)])
+        self.assertEqual(MonthlyEntryRollup.objects.verify(), [])
+
+        row = MonthlyEntryRollup.objects.get(specialty="psychologist")
+        self.assertEqual(row.month, timezone.localdate().replace(day=1))
+
+    def test_soft_delete_decrements(self):
+        entry = self._create()
+        self._create()
+        entry.soft_delete(user=self.psychologist, reason="Erro")
+        self.assertEqual(self._counts(), [("psychologist", 1)])
+        # Saving a deleted entry again changes nothing
+        entry.save()
+        self.assertEqual(self._counts(), [("psychologist", 1)])
+        self.assertEqual(MonthlyEntryRollup.objects.verify(), [])
+
+    def test_batch_create_is_recorded(self):
+        self.client.force_authenticate(user=self.psychologist)
+        response = self.client.post(
+            reverse("medical_entry_batch"),
+            {
+                "entries": [
+                    {"student_id": str(self.student.id), "description": f"E{i}"}
+                    for i in range(3)
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._counts(), [("psychologist", 3)])
+
+    def test_command_detects_and_fixes_drift(self):
+        self._create()
+        MedicalEntry.objects.update(entry_date=timezone.now() - timedelta(days=400))
+        self.assertEqual(len(MonthlyEntryRollup.objects.verify()), 2)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "rebuild_entry_rollup",
+                "--verify-only",
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+        call_command("rebuild_entry_rollup", stdout=StringIO())
+        self.assertEqual(MonthlyEntryRollup.objects.verify(), [])
+        self.assertEqual(self._counts(), [("psychologist", 1)])
+
+
+class MonthlyEntryRollupConcurrencyTests(TransactionTestCase):
+    def test_concurrent_soft_deletes_decrement_once(self):
+        psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=psychologist, specialty="psychologist", council_number="1"
+        )
+        student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        entry = MedicalEntry.objects.create(
+            student=student, healthpro=psychologist, description="Sessão"
+        )
+        MedicalEntry.objects.create(
+            student=student, healthpro=psychologist, description="Sessão"
+        )
+        deleted, release = threading.Event(), threading.Event()
+
+        def first():
+            # Deletes and holds its transaction open until released
+            try:
+                with transaction.atomic():
+                    MedicalEntry.objects.get(pk=entry.pk).soft_delete(
+                        user=psychologist, reason="Erro"
+                    )
+                    deleted.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        def second():
+            # Loaded before the first delete commits, like a concurrent request
+            try:
+                MedicalEntry.objects.get(pk=entry.pk).soft_delete(
+                    user=psychologist, reason="Erro"
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        threads[0].start()
+        self.assertTrue(deleted.wait(5))
+        threads[1].start()
+        # Give the second delete time to reach the previous-state read
+        time.sleep(0.3)
+        release.set()
+        for thread in threads:
+            thread.join(10)
+
+        self.assertEqual(
+            MonthlyEntryRollup.objects.values_list("count", flat=True).get(), 1
+        )
+        self.assertEqual(MonthlyEntryRollup.objects.verify(), [])
+
+
+class MedicalEntrySoftDeleteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+
+    def _create(self, deleted_days_ago=None):
+        entry = MedicalEntry.objects.create(
+            student=self.student, healthpro=self.psychologist, description="Sessão"
+        )
+        if deleted_days_ago is not None:
+            entry.soft_delete(user=self.psychologist, reason="Duplicada")
+            MedicalEntry.all_with_deleted.filter(pk=entry.pk).update(
+                delete_date=timezone.now() - timedelta(days=deleted_days_ago)
+            )
+        return entry
+
+    def _archive(self, *args):
+        stdout = StringIO()
+        call_command("archive_deleted_entries", "--days", "30", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_default_manager_hides_deleted(self):
+        active = self._create()
+        deleted = self._create(deleted_days_ago=0)
+
+        self.assertEqual(list(MedicalEntry.objects.all()), [active])
+        self.assertEqual(list(self.student.medical_entries.all()), [active])
+        self.assertEqual(
+            set(MedicalEntry.all_with_deleted.all()), {active, deleted}
+        )
+
+    def test_deleted_entry_is_not_found_for_delete_either(self):
+        entry = self._create(deleted_days_ago=0)
+        self.client.force_authenticate(user=self.psychologist)
+        url = reverse("medical_entry_detail", args=[entry.pk])
+
+        response = self.client.delete(url, {"delete_reason": "De novo"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archive_moves_old_deleted_entries_in_batches(self):
+        active = self._create()
+        recent = self._create(deleted_days_ago=5)
+        old = [self._create(deleted_days_ago=40 + i) for i in range(3)]
+
+        self.assertIn("3 entradas seriam arquivadas", self._archive("--dry-run"))
+        self.assertEqual(ArchivedMedicalEntry.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn("3 entradas arquivadas", self._archive("--batch-size", "2"))
+        moves = [q for q in queries.captured_queries if "WITH moved" in q["sql"]]
+        self.assertEqual(len(moves), 2)
+
+        self.assertEqual(
+            set(MedicalEntry.all_with_deleted.values_list("pk", flat=True)),
+            {active.pk, recent.pk},
+        )
+        archived = ArchivedMedicalEntry.objects.get(pk=old[0].pk)
+        self.assertEqual(archived.deleted_by, self.psychologist)
+        self.assertEqual(archived.delete_reason, "Duplicada")
+        self.assertEqual(archived.specialty, "psychologist")
+        self.assertEqual(archived.entry_date, old[0].entry_date)
+        self.assertIsNotNone(archived.archived_at)
+
+        # Deleted entries were already out of the rollup
+        self.assertEqual(MonthlyEntryRollup.objects.verify(), [])
+        self.assertIn("0 entradas arquivadas", self._archive())
+
+
+class MedicalEntryPartitioningTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        cls.old_entry = MedicalEntry.objects.create(
+            student=cls.student, healthpro=cls.psychologist, description="Ansiedade"
+        )
+        MedicalEntry.objects.filter(pk=cls.old_entry.pk).update(
+            entry_date=timezone.make_aware(datetime(2025, 11, 20, 10))
+        )
+        cls.entry = MedicalEntry.objects.create(
+            student=cls.student, healthpro=cls.psychologist, description="Sessão"
+        )
+
+    def _convert(self, *args):
+        call_command("partition_medical_entries", *args, stdout=StringIO())
+
+    def _partitions(self):
+        with connection.cursor() as cursor:
+            return partitions(cursor)
+
+    def test_conversion_keeps_rows_and_ids(self):
+        self._convert("--ahead", "2")
+
+        names = self._partitions()
+        self.assertIn(f"{TABLE}_p2025_11", names)
+        self.assertIn(partition_name(timezone.localdate(), "month"), names)
+        self.assertIn(f"{TABLE}_default", names)
+        self.assertEqual(
+            set(MedicalEntry.objects.values_list("id", flat=True)),
+            {self.old_entry.id, self.entry.id},
+        )
+        # The search vector is generated again in the new table
+        self.assertEqual(
+            list(MedicalEntry.objects.search("ansiedade").values_list("id", flat=True)),
+            [self.old_entry.id],
+        )
+
+        new_entry = MedicalEntry.objects.create(
+            student=self.student, healthpro=self.psychologist, description="Nova"
+        )
+        self.assertGreater(new_entry.id, self.entry.id)
+        self.client.force_authenticate(user=self.psychologist)
+        response = self.client.get(reverse("medical_entry_list"))
+        self.assertEqual(len(response.data), 3)
+
+    def test_yearly_interval(self):
+        self._convert("--interval", "year", "--ahead", "1")
+        names = self._partitions()
+        self.assertIn(f"{TABLE}_p2025", names)
+        self.assertEqual(detect_interval(names), "year")
+
+    def test_converting_twice_fails(self):
+        self._convert()
+        with self.assertRaises(CommandError):
+            self._convert()
+
+    def test_future_partitions_take_rows_from_default(self):
+        self._convert("--ahead", "0")
+        far = timezone.make_aware(datetime(2030, 3, 10, 12))
+        MedicalEntry.objects.filter(pk=self.entry.pk).update(entry_date=far)
+
+        call_command("create_entry_partitions", "--ahead", "2", stdout=StringIO())
+        month = period_start(timezone.localdate(), "month")
+        for _ in range(2):
+            month = next_period(month, "month")
+            self.assertIn(partition_name(month, "month"), self._partitions())
+
+        with connection.cursor() as cursor:
+            create_partitions(cursor, far.date(), far.date(), "month")
+            cursor.execute(f"SELECT id FROM {TABLE}_p2030_03")
+            self.assertEqual(cursor.fetchall(), [(self.entry.id,)])
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE}_default")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_creating_partitions_requires_partitioned_table(self):
+        with self.assertRaises(CommandError):
+            call_command("create_entry_partitions", stdout=StringIO())
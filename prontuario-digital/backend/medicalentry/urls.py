@@ -3,6 +3,16 @@ from medicalentry import views
 
 urlpatterns = [
     path("api/medical-entry/", views.medical_entry_list, name="medical_entry_list"),
+    path(
+        "api/medical-entry/batch/",
+        views.medical_entry_batch,
+        name="medical_entry_batch",
+    ),
+    path(
+        "api/medical-entry/aggregates/",
+        views.medical_entry_aggregates,
+        name="medical_entry_aggregates",
+    ),
     path(
         "api/medical-entry/<int:pk>/",
         views.medical_entry_detail,
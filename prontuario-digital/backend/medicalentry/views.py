@@ -1,52 +1,117 @@
+import uuid
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
-from .models import MedicalEntry
+from .cache import (
+    aggregates_key,
+    get_aggregates,
+    get_timeline,
+    invalidate_aggregates,
+    invalidate_timeline,
+    set_aggregates,
+    set_timeline,
+    timeline_key,
+)
+from .models import MedicalEntry, MonthlyEntryRollup
 from .serializers import MedicalEntrySerializer
 from students.models import Student
 from authentication.permissions import (
     HealthProfWriteAllRead,
     IsAdminOrHealthProfessional,
 )
+from utils.conditional import ConditionalValidators
+from utils.middleware import cache_compressed
+from utils.pagination import KeysetPagination, ordering_fields
+from utils.renderers import FAST_RENDERER_CLASSES
+from utils.serializers import SparseFieldset
+from utils.streaming import stream_json_array, wants_stream
+
+
+ENTRY_ORDERING = ("-entry_date", "-id")
+BATCH_MAX_ENTRIES = 200
+
+
+def entry_paginator(ordering=ENTRY_ORDERING):
+    return KeysetPagination(ordering=ordering)
+
+
+def filter_entries(request, queryset):
+    """
+    Filtros da listagem, também usados nos agregados: student_id, escopo do
+    usuário e busca textual (q). Retorna o queryset e o termo buscado.
+    """
+    student_id = request.query_params.get("student_id")
+    if student_id:
+        try:
+            student_obj = Student.objects.get(pk=student_id)
+        except Student.DoesNotExist:
+            raise NotFound("Student not found")
+        queryset = queryset.filter(student=student_obj)
+
+    queryset = queryset.visible_to(request.user)
+
+    search = request.query_params.get("q", "").strip()
+    if search:
+        queryset = queryset.search(search)
+    return queryset, search
+
+
+def period_range(year, month=None):
+    """
+    [início, fim) do ano, ou do mês, no fuso atual
+    """
+    if month is None:
+        start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    else:
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
 
 
 @api_view(["GET", "POST"])
+@renderer_classes(FAST_RENDERER_CLASSES)
 @permission_classes([HealthProfWriteAllRead])
 def medical_entry_list(request):
     """
     GET: Lista entradas de prontuário (todos podem ver a lista)
     POST: Cria nova entrada (apenas health_prof)
     Query params: student_id (opcional) - filtra por estudante específico
+                  q (opcional) - busca textual em descrição e notas, ordenada por relevância
+                  cursor, page_size (opcionais) - ativam a paginação por cursor
+                  fields, expand (opcionais) - campos a retornar e relações
+                  aninhadas a expandir (student, healthpro)
+                  stream (opcional) - true envia a lista sem paginação em streaming
     """
 
     if request.method == "GET":
-        student_id = request.query_params.get("student_id")
+        sparse = SparseFieldset(request, MedicalEntrySerializer)
+        queryset, search = filter_entries(request, MedicalEntry.objects.all())
 
-        queryset = MedicalEntry.objects.filter(deleted=False)
+        ordering = ENTRY_ORDERING
+        if search:
+            ordering = ("-rank",) + ENTRY_ORDERING
 
-        if student_id:
-            try:
-                student_obj = Student.objects.get(pk=student_id)
-                queryset = queryset.filter(student=student_obj)
-            except Student.DoesNotExist:
-                return Response(
-                    {"detail": "Student not found"},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
+        fast = sparse.values_serializer()
+        entries = fast.rows(
+            queryset.order_by(*ordering),
+            extra=ordering_fields(ordering),
+        )
 
-        if request.user.role == "health_prof":
-            if hasattr(request.user, "health_profile"):
-                user_specialty = request.user.health_profile.specialty
-                queryset = queryset.filter(
-                    healthpro__health_profile__specialty=user_specialty
-                )
-            else:
-                queryset = queryset.none()
+        paginator = entry_paginator(ordering)
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(entries, request)
+            return paginator.get_paginated_response(fast.serialize(page))
 
-        entries = queryset.order_by("-entry_date")
+        if wants_stream(request):
+            return stream_json_array(entries, fast.serialize)
 
-        serializer = MedicalEntrySerializer(entries, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(fast.serialize(entries), status=status.HTTP_200_OK)
 
     elif request.method == "POST":
         if request.user.role != "health_prof":
@@ -80,7 +145,11 @@ def medical_entry_list(request):
             data=request.data, context={"request": request}
         )
         if serializer.is_valid():
-            serializer.save(student=student_obj, healthpro=request.user)
+            serializer.save(
+                student=student_obj,
+                healthpro=request.user,
+                specialty=request.user.health_profile.specialty,
+            )
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED,
@@ -88,6 +157,111 @@ def medical_entry_list(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["POST"])
+@permission_classes([HealthProfWriteAllRead])
+def medical_entry_batch(request):
+    """
+    POST: Cria várias entradas de uma vez (apenas health_prof)
+    Body: {"entries": [{"student_id", "description", "notes"}, ...]}
+    Tudo ou nada: se algum item for inválido nada é gravado e a resposta traz
+    os erros de cada item pelo índice.
+    """
+
+    if request.user.role != "health_prof":
+        return Response(
+            {"detail": "Only health professionals can create entries"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    if not hasattr(request.user, "health_profile"):
+        return Response(
+            {"detail": "Health profile not found"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    items = request.data.get("entries") if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return Response(
+            {"detail": "entries must be a non-empty list"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > BATCH_MAX_ENTRIES:
+        return Response(
+            {"detail": f"A batch accepts at most {BATCH_MAX_ENTRIES} entries"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = MedicalEntrySerializer(data=items, many=True)
+    serializer.is_valid()
+    errors = [dict(item_errors) for item_errors in serializer.errors] or [
+        {} for _ in items
+    ]
+
+    # Resolve every student in one query
+    student_ids = {
+        str(item["student_id"])
+        for item in items
+        if isinstance(item, dict) and item.get("student_id")
+    }
+    students = {
+        str(pk): student
+        for pk, student in Student.objects.in_bulk(
+            [pk for pk in student_ids if _is_uuid(pk)]
+        ).items()
+    }
+
+    for index, item in enumerate(items):
+        student_id = item.get("student_id") if isinstance(item, dict) else None
+        if not student_id:
+            errors[index]["student_id"] = ["student_id is required"]
+        elif str(student_id) not in students:
+            errors[index]["student_id"] = ["Student not found"]
+
+    if any(errors):
+        return Response(
+            {
+                "detail": "No entries were created",
+                "errors": [
+                    {"index": index, "errors": item_errors}
+                    for index, item_errors in enumerate(errors)
+                    if item_errors
+                ],
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    specialty = request.user.health_profile.specialty
+    entries = [
+        MedicalEntry(
+            **validated,
+            student=students[str(item["student_id"])],
+            healthpro=request.user,
+            specialty=specialty,
+        )
+        for item, validated in zip(items, serializer.validated_data)
+    ]
+    with transaction.atomic():
+        MedicalEntry.objects.bulk_create(entries)
+        # bulk_create skips save(), so update the rollup and caches here
+        MonthlyEntryRollup.objects.record_entries(entries)
+        for student_id in {entry.student_id for entry in entries}:
+            invalidate_timeline(student_id)
+        invalidate_aggregates()
+
+    return Response(
+        MedicalEntrySerializer(entries, many=True).data,
+        status=status.HTTP_201_CREATED,
+    )
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
 @api_view(["GET", "DELETE"])
 @permission_classes([IsAdminOrHealthProfessional])
 def medical_entry_detail(request, pk):
@@ -97,7 +271,9 @@ def medical_entry_detail(request, pk):
     """
 
     try:
-        entry = MedicalEntry.objects.get(pk=pk, deleted=False)
+        # Deleted entries are hidden (404), for DELETE too. The requesting
+        # user's specialty comes along in the same query
+        entry = MedicalEntry.objects.with_viewer_specialty(request.user).get(pk=pk)
     except MedicalEntry.DoesNotExist:
         return Response(
             {"detail": "Medical entry not found"},
@@ -106,23 +282,19 @@ def medical_entry_detail(request, pk):
 
     if request.method == "GET":
         if request.user.role == "health_prof":
-            if not hasattr(request.user, "health_profile"):
+            if entry.viewer_specialty is None:
                 return Response(
                     {"detail": "Health profile not found"},
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
-            user_specialty = request.user.health_profile.specialty
-
-            if not hasattr(entry.healthpro, "health_profile"):
+            if not entry.specialty:
                 return Response(
                     {"detail": "Entry creator health profile not found"},
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
-            entry_specialty = entry.healthpro.health_profile.specialty
-
-            if user_specialty != entry_specialty:
+            if entry.viewer_specialty != entry.specialty:
                 return Response(
                     {"detail": "You can only view entries from your specialty"},
                     status=status.HTTP_403_FORBIDDEN,
@@ -158,13 +330,20 @@ def medical_entry_detail(request, pk):
 
 
 @api_view(["GET"])
+@renderer_classes(FAST_RENDERER_CLASSES)
 @permission_classes([IsAdminOrHealthProfessional])
 def medical_entry_by_student(request, student_id):
     """
     Endpoint específico para buscar todas as entradas de um estudante
     Aplica as mesmas regras de permissão da listagem
+    Query params: cursor, page_size (opcionais) - ativam a paginação por cursor
+                  fields, expand (opcionais) - campos a retornar e relações
+                  aninhadas a expandir (student, healthpro)
+    Responde 304 quando If-None-Match ainda é válido
     """
 
+    sparse = SparseFieldset(request, MedicalEntrySerializer)
+
     try:
         student_obj = Student.objects.get(pk=student_id)
     except Student.DoesNotExist:
@@ -173,25 +352,122 @@ def medical_entry_by_student(request, student_id):
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    queryset = MedicalEntry.objects.filter(student=student_obj, deleted=False)
+    # Deleted entries count for the validators: a delete changes the timeline
+    visible = MedicalEntry.all_with_deleted.filter(student=student_obj).visible_to(
+        request.user
+    )
 
-    if request.user.role == "health_prof":
-        if hasattr(request.user, "health_profile"):
-            user_specialty = request.user.health_profile.specialty
-            queryset = queryset.filter(
-                healthpro__health_profile__specialty=user_specialty
-            )
-        else:
-            queryset = queryset.none()
+    # Entries are never edited, only added or soft deleted, so the newest
+    # entry/delete dates plus count and max id identify the result set; the
+    # payload also embeds the authors' names, hence their updated_at
+    state = visible.aggregate(
+        last_entry=Max("entry_date"),
+        last_delete=Max("delete_date"),
+        last_author_change=Max("healthpro__updated_at"),
+        count=Count("pk", filter=Q(deleted=False)),
+        max_id=Max("pk"),
+    )
+    last_modified = max(
+        date
+        for date in (
+            state["last_entry"],
+            state["last_delete"],
+            state["last_author_change"],
+            student_obj.updated_at,
+        )
+        if date is not None
+    )
+    # Each viewer sees only their specialty's entries
+    validators = ConditionalValidators(
+        request, last_modified, state["count"], state["max_id"], scoped=True
+    )
+    not_modified = validators.not_modified()
+    if not_modified:
+        return not_modified
+
+    fast = sparse.values_serializer()
+    entries = fast.rows(
+        visible.filter(deleted=False).order_by(*ENTRY_ORDERING),
+        extra=ordering_fields(ENTRY_ORDERING),
+    )
 
-    entries = queryset.order_by("-entry_date")
+    data = {
+        "student_id": student_id,
+        "student_name": getattr(student_obj, "name", "N/A"),
+    }
+
+    paginator = entry_paginator()
+    if paginator.is_requested(request):
+        entries = paginator.paginate_queryset(entries, request)
+        data["next"] = paginator.get_next_link()
+        data["entries"] = fast.serialize(entries)
+        return validators.apply(Response(data, status=status.HTTP_200_OK))
+
+    # The full timeline is cached per (student, scope, version)
+    cache_key = timeline_key(
+        student_obj.pk,
+        request.user,
+        (last_modified, state["count"], state["max_id"], sparse.cache_key()),
+    )
+    timeline = get_timeline(cache_key)
+    if timeline is None:
+        timeline = fast.serialize(entries)
+        set_timeline(cache_key, timeline)
+
+    data["entries"] = timeline
+    return cache_compressed(
+        validators.apply(Response(data, status=status.HTTP_200_OK))
+    )
 
-    serializer = MedicalEntrySerializer(entries, many=True)
-    return Response(
-        {
-            "student_id": student_id,
-            "student_name": getattr(student_obj, "name", "N/A"),
-            "entries": serializer.data,
-        },
-        status=status.HTTP_200_OK,
+
+@api_view(["GET"])
+@permission_classes([HealthProfWriteAllRead])
+def medical_entry_aggregates(request):
+    """
+    Contagens de entradas por especialidade, por profissional e por mês para
+    o dashboard, calculadas no banco em uma consulta e guardadas em cache.
+    Vêm do rollup mensal; só a busca textual (q) precisa ler as entradas.
+    Query params: year (opcional) - ano do período, padrão o ano atual
+                  month (opcional) - restringe o período a um mês
+                  student_id, q (opcionais) - mesmos filtros da listagem
+    """
+
+    try:
+        year = int(request.query_params.get("year", timezone.localdate().year))
+        month = request.query_params.get("month")
+        month = int(month) if month else None
+    except ValueError:
+        return Response(
+            {"detail": "Parameters must be integers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        start, end = period_range(year, month)
+    except (ValueError, OverflowError):
+        return Response(
+            {"detail": "Invalid year or month"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if request.query_params.get("q", "").strip():
+        # A half-open range keeps the scan on medentry_active_date_idx
+        queryset = MedicalEntry.objects.filter(
+            entry_date__gte=start, entry_date__lt=end
+        )
+    else:
+        queryset = MonthlyEntryRollup.objects.filter(
+            month__gte=start.date(), month__lt=end.date()
+        )
+    queryset, search = filter_entries(request, queryset)
+
+    cache_key = aggregates_key(
+        request.user,
+        (request.query_params.get("student_id"), search, year, month),
     )
+    data = get_aggregates(cache_key)
+    if data is None:
+        data = {"year": year, "month": month, **queryset.activity_counts()}
+        set_aggregates(cache_key, data)
+
+    return cache_compressed(Response(data, status=status.HTTP_200_OK))
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     "students",
     "medicalentry",
     "reports",
+    "sync",
     # DRF
     "rest_framework",
     "rest_framework.authtoken",
@@ -54,11 +55,13 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "utils.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -71,6 +74,13 @@ AUTH_USER_MODEL = "authentication.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # MessagePack when the client asks for application/msgpack; the large lists
+    # render JSON with orjson instead (utils.renderers.FAST_RENDERER_CLASSES)
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "utils.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.TokenAuthentication",
@@ -152,6 +162,59 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default (per process); set REDIS_URL to share the cache
+# between workers in production (requires the redis package). The cached
+# student list and timelines are keyed by state read from the database too,
+# so a worker never serves them stale after another worker's write.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a serialized student timeline stays cached (per version)
+MEDICAL_ENTRY_TIMELINE_CACHE_TIMEOUT = int(
+    os.getenv("MEDICAL_ENTRY_TIMELINE_CACHE_TIMEOUT", 3600)
+)
+
+# Seconds the dashboard aggregates stay cached (per version and period)
+MEDICAL_ENTRY_AGGREGATES_CACHE_TIMEOUT = int(
+    os.getenv("MEDICAL_ENTRY_AGGREGATES_CACHE_TIMEOUT", 3600)
+)
+
+# Seconds a serialized student list stays cached (per version and params)
+STUDENT_ROSTER_CACHE_TIMEOUT = int(os.getenv("STUDENT_ROSTER_CACHE_TIMEOUT", 3600))
+
+# Delta sync only returns changes older than this, so transactions that
+# commit late are not skipped by a cursor that was already handed out
+SYNC_SAFETY_WINDOW_SECONDS = int(os.getenv("SYNC_SAFETY_WINDOW_SECONDS", 30))
+
+# Soft-deleted entries older than this are moved to the archive table by
+# archive_deleted_entries; sync cursors older than this are rejected, since
+# the tombstones they would still need may already be archived
+MEDICAL_ENTRY_ARCHIVE_RETENTION_DAYS = int(
+    os.getenv("MEDICAL_ENTRY_ARCHIVE_RETENTION_DAYS", 180)
+)
+
+# Response compression (gzip, plus br/zstd when brotli/zstandard are
+# installed): smaller bodies are sent as they are
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+# Seconds a compressed copy of a cached response body is kept
+COMPRESSION_CACHE_TIMEOUT = int(os.getenv("COMPRESSION_CACHE_TIMEOUT", 3600))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -39,6 +39,7 @@ urlpatterns = [
     path("", include("students.urls")),
     path("", include("medicalentry.urls")),
     path("", include("reports.urls")),
+    path("", include("sync.urls")),
     path("api/auth/", include(router.urls)),
     # path("api/login/", CustomAuthToken.as_view(), name="api_login"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
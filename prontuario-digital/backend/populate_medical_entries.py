@@ -7,7 +7,7 @@ import random
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "medicalrecord.settings")
 django.setup()
 
-from medicalentry.models import MedicalEntry
+from medicalentry.models import MedicalEntry, MonthlyEntryRollup
 from students.models import Student
 from authentication.models import User, HealthProfile
 
@@ -59,9 +59,11 @@ def create_medical_entries_batch(num_entries=100, student_id=None):
         # Garante que a especialidade do profissional seja válida para os dados
         try:
             specialty = healthpro.health_profile.specialty
+            entry_specialty = specialty
         except HealthProfile.DoesNotExist:
             # Se o usuário não tiver HealthProfile, usa uma especialidade aleatória para o exemplo
             specialty = random.choice(specialties)
+            entry_specialty = None
 
         # Dados da entrada médica
         description = f"Entrada de teste ({specialty}) - Descrição {i + 1}"
@@ -79,11 +81,14 @@ def create_medical_entries_batch(num_entries=100, student_id=None):
             description=description,
             notes=notes,
             entry_date=entry_date,
+            # bulk_create não chama save(), então a especialidade vai explícita
+            specialty=entry_specialty,
         )
         new_entries.append(entry)
 
     # Usa bulk_create para inserir todos os objetos de uma vez
     MedicalEntry.objects.bulk_create(new_entries)
+    MonthlyEntryRollup.objects.record_entries(new_entries)
     print(
         f"{num_entries} entradas médicas criadas com sucesso para o estudante '{student_to_use.name}'."
     )
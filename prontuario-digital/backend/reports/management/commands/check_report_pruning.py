@@ -0,0 +1,53 @@
+import calendar
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from medicalentry.partitioning import is_partitioned, scanned_partitions
+from reports.views import month_range, monthly_entries, student_interval_entries
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Confere, pelo EXPLAIN, que as consultas do relatório mensal e do "
+        "relatório por estudante leem uma única partição da tabela de entradas."
+    )
+
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument("--year", type=int, default=today.year)
+        parser.add_argument("--month", type=int, default=today.month)
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            if not is_partitioned(cursor):
+                raise CommandError("The entry table is not partitioned")
+
+        year, month = options["year"], options["month"]
+        start_date, end_date = month_range(year, month)
+        _, last_day = calendar.monthrange(year, month)
+        student = Student.objects.order_by("pk").first()
+
+        checks = [("monthly_report", monthly_entries(start_date, end_date))]
+        if student is not None:
+            # Same bounds student_interval_report builds from the dates
+            interval_end = timezone.make_aware(
+                datetime(year, month, last_day, 23, 59, 59)
+            )
+            checks.append(
+                (
+                    "student_interval_report",
+                    student_interval_entries(student, start_date, interval_end),
+                )
+            )
+
+        failed = False
+        for name, queryset in checks:
+            scanned = sorted(scanned_partitions(queryset))
+            self.stdout.write(f"{name}: {', '.join(scanned) or '(nenhuma)'}")
+            failed = failed or len(scanned) > 1
+        if failed:
+            raise CommandError("Partition pruning did not apply")
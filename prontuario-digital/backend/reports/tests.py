@@ -3,6 +3,11 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import date
 from unittest.mock import patch, Mock
+from openpyxl import load_workbook
+from io import StringIO
+import io
+
+from django.core.management import call_command
 
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
@@ -10,6 +15,7 @@ from rest_framework import status
 from .views import ExcelRenderer
 from .models import ReportLog
 from medicalentry.models import MedicalEntry
+from medicalentry.partitioning import partition_name
 from students.models import Student
 
 
@@ -436,6 +442,53 @@ class ReportIntegrationTestCase(APITestCase):
         )
         self.assertIn("attachment", response["Content-Disposition"])
 
+    def test_monthly_report_summary_comes_from_rollup(self):
+        """Testa a aba de resumo do relatório mensal, lida do rollup"""
+        self.client.force_authenticate(user=self.user)
+        self.medical_entries[0].soft_delete(user=self.user, reason="Erro")
+
+        response = self.client.get("/api/reports/medical-entries/monthly/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workbook = load_workbook(io.BytesIO(response.content))
+        rows = list(workbook["Resumo"].values)
+        self.assertEqual(
+            rows,
+            [
+                ("Especialidade", "Profissional", "Estudante", "Entradas ativas"),
+                (None, "Test User", "João Silva", 2),
+                ("Total", None, None, 2),
+            ],
+        )
+
+    def test_reports_leave_out_deleted_entries(self):
+        """Testa que entradas excluídas não aparecem nos relatórios"""
+        self.client.force_authenticate(user=self.user)
+        deleted = self.medical_entries[0]
+        deleted.soft_delete(user=self.user, reason="Erro")
+
+        for url in [
+            "/api/reports/medical-entries/monthly/",
+            f"/api/reports/medical-entries/interval/{self.student.pk}/",
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            sheet = load_workbook(io.BytesIO(response.content)).worksheets[0]
+            ids = [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)]
+            self.assertEqual(len(ids), len(self.medical_entries) - 1)
+            self.assertNotIn(deleted.id, ids)
+
+    def test_report_queries_prune_partitions(self):
+        """Testa que os relatórios leem uma só partição da tabela particionada"""
+        call_command("partition_medical_entries", stdout=StringIO())
+        stdout = StringIO()
+        call_command("check_report_pruning", stdout=stdout)
+        month = partition_name(timezone.localdate(), "month")
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            [f"monthly_report: {month}", f"student_interval_report: {month}"],
+        )
+
     def test_report_logs_creation(self):
         """Testa se os logs de relatório são criados corretamente"""
         self.client.force_authenticate(user=self.user)
@@ -555,3 +608,14 @@ class ReportViewsEdgeCasesTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Deve processar mesmo com range inválido
         self.assertGreater(len(response.content), 0)
+
+    def test_monthly_report_invalid_month(self):
+        """Testa relatório mensal com mês fora do intervalo"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(
+            "/api/reports/medical-entries/monthly/?year=2024&month=13"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "Invalid year or month")
@@ -2,7 +2,7 @@ from django.http import HttpResponse
 from rest_framework.decorators import api_view, renderer_classes, permission_classes
 from rest_framework.renderers import BaseRenderer
 from openpyxl import Workbook
-from medicalentry.models import MedicalEntry
+from medicalentry.models import MedicalEntry, MonthlyEntryRollup
 from rest_framework.response import Response
 from rest_framework import status
 from datetime import date, datetime
@@ -12,6 +12,7 @@ from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated as DRFIsAuthenticated
 from .models import ReportLog
 from .serializers import ReportLogSerializer
+from utils.serializers import ValuesSerializer
 import calendar
 import io
 
@@ -26,6 +27,35 @@ class ExcelRenderer(BaseRenderer):
         return data
 
 
+def month_range(year, month):
+    """
+    Returns the [start, end) datetimes of a month in the current timezone
+    """
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+def monthly_entries(start_date, end_date):
+    # A half-open range keeps the scan on medentry_active_date_idx (and on a
+    # single partition when the table is partitioned); the default manager
+    # already leaves deleted entries out
+    return MedicalEntry.objects.filter(
+        entry_date__gte=start_date,
+        entry_date__lt=end_date,
+    ).order_by("entry_date")
+
+
+def student_interval_entries(student, start_date, end_date):
+    return MedicalEntry.objects.filter(
+        entry_date__range=(start_date, end_date),
+        student=student,
+    ).order_by("entry_date")
+
+
 @api_view(["GET"])
 @renderer_classes([ExcelRenderer])
 @permission_classes([DRFIsAuthenticated])
@@ -53,10 +83,16 @@ def monthly_report(request):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-    entries = MedicalEntry.objects.filter(
-        entry_date__year=int(year),
-        entry_date__month=int(month),
-    ).order_by("entry_date")
+    # __year/__month would be evaluated row by row with EXTRACT
+    try:
+        start_date, end_date = month_range(year, month)
+    except (ValueError, OverflowError):
+        return Response(
+            {"detail": "Invalid year or month"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    entries = monthly_entries(start_date, end_date)
 
     workbook = Workbook()
     sheet = workbook.active
@@ -77,6 +113,22 @@ def monthly_report(request):
         ]
         sheet.append(row_data)
 
+    # Resumo do mês direto do rollup, sem reagrupar as entradas
+    summary = workbook.create_sheet("Resumo")
+    summary.append(["Especialidade", "Profissional", "Estudante", "Entradas ativas"])
+    rollup = (
+        MonthlyEntryRollup.objects.filter(month=start_date.date(), count__gt=0)
+        .select_related("healthpro", "student")
+        .order_by("specialty", "healthpro__first_name", "student__name")
+    )
+    total = 0
+    for row in rollup:
+        summary.append(
+            [row.specialty, row.healthpro.get_full_name(), row.student.name, row.count]
+        )
+        total += row.count
+    summary.append(["Total", None, None, total])
+
     # Salva o workbook em um buffer de memória
     buffer = io.BytesIO()
     workbook.save(buffer)
@@ -129,10 +181,7 @@ def student_interval_report(request, pk):
         _, last_day = calendar.monthrange(today.year, today.month)
         end_date = today.replace(day=last_day, hour=23, minute=59, second=59)
 
-    entries = MedicalEntry.objects.filter(
-        entry_date__range=(start_date, end_date),
-        student=student_obj,
-    ).order_by("entry_date")
+    entries = student_interval_entries(student_obj, start_date, end_date)
 
     workbook = Workbook()
     sheet = workbook.active
@@ -175,5 +224,5 @@ def student_interval_report(request, pk):
 def view_history(request):
     if request.method == "GET":
         reportLog = ReportLog.objects.order_by("date")
-        serializer = ReportLogSerializer(reportLog, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fast = ValuesSerializer(ReportLogSerializer())
+        return Response(fast.data(reportLog), status=status.HTTP_200_OK)
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.utils import timezone
+from .cache import invalidate_roster
 from .models import Student
 
 
@@ -6,17 +8,31 @@ from .models import Student
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ["name", "cgm", "dob", "active"]
-    search_fields = ["name", "cgm"]
+    search_fields = ["name", "cgm", "guardian"]
     readonly_fields = ["id"]
 
     actions = ["restore_inactive_student"]
 
     def restore_inactive_student(self, request, queryset):
-        queryset.update(active=True)
+        # update() skips auto_now; updated_at drives the student list ETag
+        queryset.update(active=True, updated_at=timezone.now())
+        # update() does not call Student.save()
+        invalidate_roster()
         self.message_user(
             request, f"{queryset.count()} estudantes restaurados com sucesso."
         )
         self.short_description = "Restaurar estudantes selecionados"
 
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        # delete_selected deletes in bulk, without Student.delete()
+        invalidate_roster()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Same trigram indexes as the API search instead of ILIKE '%x%' scans
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
+
     def get_queryset(self, request):
         return Student.objects.all()
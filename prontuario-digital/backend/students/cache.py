@@ -0,0 +1,37 @@
+"""
+Cache da listagem de estudantes (student_list), já serializada.
+
+A chave combina a versão atual, os query params e o estado barato que a
+view já calcula para o ETag. Toda gravação de Student incrementa a versão
+(Student.save, os sinais de delete, e explicitamente onde um update() ou
+bulk_create() passa por fora do save); o estado, lido da tabela, cobre as
+gravações feitas em outro worker quando o cache é local a cada processo.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from utils.versioned_cache import current_version, digest, invalidate
+
+KEY_PREFIX = "students:roster"
+VERSION_KEY = f"{KEY_PREFIX}:version"
+
+
+def invalidate_roster():
+    invalidate(VERSION_KEY)
+
+
+def roster_key(params, state=()):
+    """
+    `params` are the request query params (filters, ordering, fields)
+    """
+    version = current_version(VERSION_KEY)
+    return f"{KEY_PREFIX}:{version}:{digest([sorted(params.lists()), state])}"
+
+
+def get_roster(key):
+    return cache.get(key)
+
+
+def set_roster(key, students):
+    cache.set(key, students, settings.STUDENT_ROSTER_CACHE_TIMEOUT)
@@ -0,0 +1,164 @@
+"""
+Detecção de estudantes cadastrados mais de uma vez (transferências
+recadastradas).
+
+No cadastro e na importação a checagem é exata, pelas chaves normalizadas de
+Student.objects.duplicates_of() (mesmo CGM, ou mesmo nome sem acentos, data
+de nascimento e CPF do responsável), sempre por índice. similar_pairs() e
+clusters() procuram, para revisão, os casos que essas chaves não pegam:
+nomes parecidos (similaridade trigram do pg_trgm) com a mesma data de
+nascimento ou o mesmo responsável.
+"""
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Student, search_key
+
+TABLE = Student._meta.db_table
+NAME_KEY = "lower(immutable_unaccent({}.name))"
+SIMILARITY_THRESHOLD = 0.5
+
+
+def name_keys(names):
+    """
+    Chave normalizada de cada nome, calculada pelo banco com a mesma
+    expressão do índice (unaccent não tem equivalente exato em Python)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT {NAME_KEY.format("t")}
+            FROM unnest(%s::text[]) WITH ORDINALITY AS t(name, position)
+            ORDER BY t.position
+            """,
+            [list(names)],
+        )
+        return [key for (key,) in cursor.fetchall()]
+
+
+class DuplicateChecker:
+    """
+    Checagem da importação, bloco a bloco: cada bloco custa duas consultas
+    (as chaves dos nomes e os estudantes com o mesmo CGM ou CPF do
+    responsável) e também é comparado com as linhas já aceitas do arquivo.
+    """
+
+    def __init__(self):
+        # Keys of the rows accepted so far -> row number
+        self.seen = {}
+
+    def check(self, rows):
+        """
+        `rows` é uma lista de (número da linha, Student não salvo). Retorna
+        {número da linha: [mensagens]} das linhas duplicadas; as demais
+        passam a contar como já vistas.
+        """
+        if not rows:
+            return {}
+        students = [student for _, student in rows]
+        keys = name_keys(student.name for student in students)
+
+        existing = {}
+        matches = (
+            Student.objects.filter(
+                Q(cgm__in={student.cgm for student in students})
+                | Q(guardian_cpf__in={student.guardian_cpf for student in students})
+            )
+            .annotate(name_key=search_key("name"))
+            .values_list("pk", "cgm", "guardian_cpf", "dob", "name_key")
+        )
+        for pk, cgm, guardian_cpf, dob, name_key in matches:
+            existing.setdefault(("cgm", cgm), pk)
+            existing.setdefault(("identity", guardian_cpf, dob, name_key), pk)
+
+        duplicates = {}
+        for (number, student), name_key in zip(rows, keys):
+            row_keys = [
+                ("cgm", student.cgm),
+                ("identity", student.guardian_cpf, student.dob, name_key),
+            ]
+            messages = []
+            for key in row_keys:
+                # Earlier blocks are already in the table (unless dry run);
+                # point at the row of the file either way
+                if key in self.seen:
+                    messages.append(self.message(key, self.seen[key], "row"))
+                elif key in existing:
+                    messages.append(self.message(key, existing[key], "student"))
+            if messages:
+                duplicates[number] = messages
+            else:
+                for key in row_keys:
+                    self.seen[key] = number
+        return duplicates
+
+    @staticmethod
+    def message(key, other, kind):
+        fields = "cgm" if key[0] == "cgm" else "name, dob and guardian_cpf"
+        return f"Same {fields} as {kind} {other}"
+
+
+def similar_pairs(threshold=SIMILARITY_THRESHOLD):
+    """
+    Pares (id, id, similaridade trigram dos nomes) de estudantes com a mesma
+    data de nascimento ou o mesmo CPF do responsável e nomes com
+    similaridade >= `threshold`, mais os que repetem o CGM.
+
+    A similaridade só é calculada dentro desses blocos: um self-join pelo
+    operador % varreria, para cada nome, os trigramas que quase todos os
+    nomes têm em comum ("mar", "sil", " da").
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH keyed AS MATERIALIZED (
+                SELECT id, dob, guardian_cpf, cgm, {NAME_KEY.format(TABLE)} AS key
+                FROM {TABLE}
+            ),
+            candidates AS (
+                SELECT a.id AS a_id, b.id AS b_id, a.key AS a_key, b.key AS b_key
+                FROM keyed AS a JOIN keyed AS b ON a.dob = b.dob AND a.id < b.id
+                UNION
+                SELECT a.id, b.id, a.key, b.key
+                FROM keyed AS a
+                JOIN keyed AS b ON a.guardian_cpf = b.guardian_cpf AND a.id < b.id
+            )
+            SELECT a_id, b_id, similarity(a_key, b_key) FROM candidates
+            WHERE similarity(a_key, b_key) >= %s
+            UNION
+            SELECT a.id, b.id, similarity(a.key, b.key)
+            FROM keyed AS a JOIN keyed AS b ON a.cgm = b.cgm AND a.id < b.id
+            """,
+            [threshold],
+        )
+        return cursor.fetchall()
+
+
+def clusters(pairs):
+    """
+    Agrupa os pares transitivamente (union-find). Retorna listas de
+    (ids, maior similaridade), da maior similaridade para a menor.
+    """
+    parent = {}
+
+    def root(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            # Path halving keeps the trees flat
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for first, second, _ in pairs:
+        parent[root(first)] = root(second)
+
+    groups = {}
+    for first, second, similarity in pairs:
+        members, best = groups.get(root(first), (set(), 0.0))
+        members.update((first, second))
+        groups[root(first)] = (members, max(best, similarity))
+    return sorted(
+        ((sorted(members), best) for members, best in groups.values()),
+        key=lambda group: (-group[1], group[0]),
+    )
@@ -0,0 +1,237 @@
+"""
+Importação em lote de estudantes a partir de CSV ou XLSX, usada pelo endpoint
+student_import e pelo comando import_students.
+
+O arquivo é lido linha a linha (csv / openpyxl em modo read-only) e validado
+em blocos: CPF e CEP do bloco inteiro de uma vez por check_cpfs / check_ceps,
+os demais campos com os campos do modelo Student. As linhas válidas entram
+com bulk_create, uma transação por bloco.
+Linhas inválidas não interrompem a importação: voltam como erros pelo
+número da linha na planilha (o cabeçalho é a linha 1). Linhas que repetem um
+estudante já cadastrado ou uma linha anterior do arquivo (DuplicateChecker)
+também ficam de fora, a menos que allow_duplicates seja passado.
+"""
+
+import codecs
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from openpyxl import load_workbook
+
+from utils.validators import check_ceps, check_cpfs, normalize_digits
+
+from .cache import invalidate_roster
+from .duplicates import DuplicateChecker
+from .models import Student
+
+IMPORT_FIELDS = (
+    "name",
+    "cgm",
+    "dob",
+    "gender",
+    "guardian",
+    "guardian_cpf",
+    "address",
+    "cep",
+    "city",
+    "state",
+)
+# Stored as digits only, like Student.save() does; checked per block
+DIGIT_FIELDS = ("guardian_cpf", "cep")
+DIGIT_CHECKS = {"guardian_cpf": check_cpfs, "cep": check_ceps}
+BATCH_SIZE = 1000
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+FIELDS = [(name, Student._meta.get_field(name)) for name in IMPORT_FIELDS]
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def read_rows(file, filename):
+    """
+    Confere o cabeçalho e retorna um iterador de (número da linha,
+    {coluna: valor}) sobre as linhas não vazias do arquivo
+    """
+    if filename.lower().endswith(".xlsx"):
+        rows = _xlsx_rows(file)
+    elif filename.lower().endswith(".csv"):
+        rows = _csv_rows(file)
+    else:
+        raise ImportFormatError("Unsupported file type. Use .csv or .xlsx")
+
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("The file is empty")
+    columns = [str(name or "").strip().lower() for name in header]
+    missing = [name for name in IMPORT_FIELDS if name not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+
+    return (
+        (number, dict(zip(columns, values)))
+        for number, values in enumerate(rows, start=2)
+        if any(value not in (None, "") for value in values)
+    )
+
+
+def _encoding(file):
+    # Excel in pt-BR saves "CSV" as Windows-1252 unless told otherwise
+    sample = file.read(65536)
+    file.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return "cp1252"
+    return "utf-8-sig"
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding=_encoding(file), newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        # Spreadsheets saved in pt-BR use ';'
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    try:
+        yield from csv.reader(text, dialect)
+    except (csv.Error, UnicodeDecodeError) as error:
+        raise ImportFormatError(f"Invalid CSV: {error}")
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+
+def _xlsx_rows(file):
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as error:
+        raise ImportFormatError(f"Invalid XLSX: {error}")
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _value(name, value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if name == "dob":
+        return _date(value)
+    if isinstance(value, int) and name in DIGIT_FIELDS:
+        # Numeric cells lose the leading zeros
+        return str(value).zfill(dict(FIELDS)[name].max_length)
+    value = str(value).strip()
+    if name in DIGIT_FIELDS:
+        return normalize_digits(value)
+    if name in ("gender", "state"):
+        return value.upper()
+    return value
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    # Left to DateField.clean() to report
+    return value
+
+
+def clean_rows(chunk):
+    """
+    Limpa um bloco de (número da linha, linha). Retorna, por linha, o número,
+    o Student (não salvo) e {} se ela é válida, senão None e os erros por
+    campo.
+    """
+    # CPF and CEP of the whole block in one call each, instead of running
+    # the field validators row by row
+    checked = {
+        name: check([_value(name, row.get(name)) for _, row in chunk])
+        for name, check in DIGIT_CHECKS.items()
+    }
+    cleaned = []
+    for index, (number, row) in enumerate(chunk):
+        values, errors = {}, {}
+        for name, field in FIELDS:
+            if name in checked:
+                result = checked[name][index]
+                if result.valid:
+                    values[name] = result.normalized
+                else:
+                    errors[name] = [result.error]
+                continue
+            try:
+                values[name] = field.clean(_value(name, row.get(name)), None)
+            except ValidationError as error:
+                errors[name] = error.messages
+        if errors:
+            cleaned.append((number, None, errors))
+        else:
+            cleaned.append((number, Student(**values), {}))
+    return cleaned
+
+
+def import_students(
+    rows,
+    user=None,
+    batch_size=BATCH_SIZE,
+    dry_run=False,
+    max_errors=None,
+    allow_duplicates=False,
+):
+    """
+    Valida e grava `rows` (de read_rows) em blocos de `batch_size`.
+    Retorna {"rows", "created", "invalid", "duplicates", "errors": [{"row",
+    "errors"}]}; `max_errors` limita só a lista de erros, não a contagem.
+    """
+    result = {"rows": 0, "created": 0, "invalid": 0, "duplicates": 0, "errors": []}
+    checker = None if allow_duplicates else DuplicateChecker()
+
+    def report(number, errors):
+        if max_errors is None or len(result["errors"]) < max_errors:
+            result["errors"].append({"row": number, "errors": errors})
+
+    rows = iter(rows)
+    while chunk := list(islice(rows, batch_size)):
+        valid = []
+        for number, student, errors in clean_rows(chunk):
+            if errors:
+                result["invalid"] += 1
+                report(number, errors)
+            else:
+                valid.append((number, student))
+        result["rows"] += len(chunk)
+
+        duplicates = checker.check(valid) if checker else {}
+        students = []
+        for number, student in valid:
+            if number in duplicates:
+                result["duplicates"] += 1
+                report(number, {"duplicate": duplicates[number]})
+            else:
+                student.created_by = student.updated_by = user
+                students.append(student)
+        if students and not dry_run:
+            with transaction.atomic():
+                Student.objects.bulk_create(students, batch_size=batch_size)
+            result["created"] += len(students)
+
+    if result["created"]:
+        # bulk_create does not go through Student.save()
+        invalidate_roster()
+    return result
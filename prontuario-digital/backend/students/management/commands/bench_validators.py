@@ -0,0 +1,141 @@
+import gc
+import random
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from utils.validators import check_ceps, check_cpfs, normalize_digits, validate_cpf
+
+
+def legacy_validate_cpf(guardian_cpf):
+    """
+    validate_cpf como era antes de check_cpfs, mantido só para comparação
+    """
+    cpf = [int(digit) for digit in guardian_cpf]
+
+    if len(guardian_cpf) != 11:
+        raise ValidationError("CPF must contain 11 digits.")
+
+    if guardian_cpf == guardian_cpf[0] * 11:
+        raise ValidationError("Invalid CPF.")
+
+    def _calculate_digit(cpf_digits):
+        val_digits = []
+        sum = 0
+        for i in range(9):
+            val_digits.append(cpf_digits[i])
+            sum += cpf_digits[i] * (10 - i)
+        mod = sum % 11
+        val_digits.append(0 if (11 - mod) > 9 else 11 - mod)
+        sum = 0
+        for i in range(10):
+            sum += val_digits[i] * (11 - i)
+        mod = sum % 11
+        val_digits.append(0 if (11 - mod) > 10 else 11 - mod)
+        return val_digits == cpf_digits
+
+    if not _calculate_digit(cpf):
+        raise ValidationError("Invalid CPF.")
+    return guardian_cpf
+
+
+def legacy_check(cpf):
+    # Student.save() normalization + the old validator
+    digits = "".join(filter(str.isdigit, cpf))
+    try:
+        legacy_validate_cpf(digits)
+    except (ValidationError, ValueError):
+        return False
+    return True
+
+
+def legacy_cep(cep):
+    return len("".join(filter(str.isdigit, cep))) == 8
+
+
+def make_cpf(rng):
+    digits = [rng.randrange(10) for _ in range(9)]
+    for weights in (range(10, 1, -1), range(11, 1, -1)):
+        remainder = sum(d * w for d, w in zip(digits, weights)) % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    cpf = "".join(map(str, digits))
+    # A third formatted, a tenth with a wrong check digit
+    if rng.random() < 0.3:
+        cpf = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+    if rng.random() < 0.1:
+        cpf = cpf[:-1] + str((int(cpf[-1]) + 1) % 10)
+    return cpf
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a validação de CPF/CEP: o validate_cpf antigo (com a "
+        "normalização de Student.save) contra validate_cpf e check_cpfs, "
+        "e confere se as respostas batem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        cpfs = [make_cpf(rng) for _ in range(options["count"])]
+        ceps = [
+            f"{number // 1000:05d}-{number % 1000:03d}"
+            for number in (rng.randrange(10**8) for _ in range(options["count"]))
+        ]
+
+        def single():
+            results = []
+            for cpf in cpfs:
+                try:
+                    validate_cpf(normalize_digits(cpf))
+                    results.append(True)
+                except ValidationError:
+                    results.append(False)
+            return results
+
+        groups = [
+            [
+                ("cpf legado", lambda: [legacy_check(cpf) for cpf in cpfs]),
+                ("validate_cpf", single),
+                ("check_cpfs", lambda: [r.valid for r in check_cpfs(cpfs)]),
+            ],
+            [
+                # Student.save() only normalized the CEP; the field checks length
+                ("cep legado", lambda: [legacy_cep(cep) for cep in ceps]),
+                ("check_ceps", lambda: [r.valid for r in check_ceps(ceps)]),
+            ],
+        ]
+        self.stdout.write(
+            f"{'caso':<14} {'itens':>8} {'total (ms)':>11} {'µs/item':>8}"
+        )
+        for cases in groups:
+            expected, baseline = None, None
+            for name, run in cases:
+                output, elapsed = self.measure(run, options["repeat"])
+                if expected is None:
+                    expected, baseline = output, elapsed
+                self.stdout.write(
+                    f"{name:<14} {len(output):>8} {elapsed:>11.1f} "
+                    f"{elapsed * 1000 / len(output):>8.2f} "
+                    f"({baseline / elapsed:.1f}x)"
+                )
+                if output != expected:
+                    # The old second check digit could be 10, rejecting valid
+                    # CPFs whose remainder was 1
+                    differ = sum(a != b for a, b in zip(output, expected))
+                    self.stdout.write(f"  {differ} respostas diferentes do legado")
+
+    def measure(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            # Start every run from the same heap: the results are GC-tracked
+            output = None
+            gc.collect()
+            start = time.perf_counter()
+            output = run()
+            timings.append((time.perf_counter() - start) * 1000)
+        return output, min(timings)
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import User
+from students.importer import BATCH_SIZE, ImportFormatError, import_students, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa estudantes de uma planilha .csv ou .xlsx (colunas name, cgm, "
+        "dob, gender, guardian, guardian_cpf, address, cep, city, state). "
+        "Linhas válidas são gravadas em lotes; as inválidas são listadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--user", help="username registrado como created_by/updated_by"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Só valida, sem gravar"
+        )
+        parser.add_argument(
+            "--allow-duplicates",
+            action="store_true",
+            help="Grava também linhas que repetem um estudante já cadastrado",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=50,
+            help="Quantos erros de linha mostrar (a contagem inclui todos)",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be >= 1")
+
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {options['user']}")
+
+        start = time.perf_counter()
+        try:
+            with open(options["path"], "rb") as file:
+                result = import_students(
+                    read_rows(file, options["path"]),
+                    user=user,
+                    batch_size=options["batch_size"],
+                    dry_run=options["dry_run"],
+                    max_errors=options["max_errors"],
+                    allow_duplicates=options["allow_duplicates"],
+                )
+        except (OSError, ImportFormatError) as error:
+            raise CommandError(str(error))
+
+        for error in result["errors"]:
+            fields = "; ".join(
+                f"{name}: {' '.join(messages)}"
+                for name, messages in error["errors"].items()
+            )
+            self.stderr.write(f"linha {error['row']}: {fields}")
+        self.stdout.write(
+            f"{result['rows']} linhas, {result['created']} estudantes criados, "
+            f"{result['invalid']} inválidas, {result['duplicates']} duplicadas "
+            f"em {time.perf_counter() - start:.1f}s"
+        )
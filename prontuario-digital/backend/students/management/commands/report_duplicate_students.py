@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.duplicates import SIMILARITY_THRESHOLD, clusters, similar_pairs
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Lista, para revisão, grupos de prováveis estudantes duplicados: nomes "
+        "parecidos (similaridade trigram) com a mesma data de nascimento ou o "
+        "mesmo CPF do responsável, ou o mesmo CGM. Não altera nada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=SIMILARITY_THRESHOLD,
+            help="Similaridade mínima entre os nomes, de 0 a 1",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=100, help="Quantos grupos mostrar"
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options["threshold"] <= 1:
+            raise CommandError("--threshold must be between 0 and 1")
+
+        start = time.perf_counter()
+        groups = clusters(similar_pairs(options["threshold"]))
+        shown = groups[: options["limit"]]
+        students = Student.objects.in_bulk(
+            [pk for members, _ in shown for pk in members]
+        )
+
+        for number, (members, similarity) in enumerate(shown, start=1):
+            self.stdout.write(f"Grupo {number} (similaridade {similarity:.2f})")
+            for pk in members:
+                student = students[pk]
+                status = "" if student.active else " [inativo]"
+                self.stdout.write(
+                    f"  {student.pk}  {student.name}  {student.dob:%d/%m/%Y}  "
+                    f"cgm {student.cgm}  responsável {student.guardian} "
+                    f"({student.guardian_cpf}){status}"
+                )
+        self.stdout.write(
+            f"{len(groups)} grupos, {sum(len(members) for members, _ in groups)} "
+            f"estudantes em {time.perf_counter() - start:.1f}s"
+        )
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 11:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.text
+import students.models
+from django.conf import settings
+from django.db import migrations
+
+# unaccent() is STABLE (it depends on search_path), so it can't be used in an
+# index expression. The wrapper pins the dictionary and is declared IMMUTABLE.
+CREATE_IMMUTABLE_UNACCENT = """
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+"""
+
+DROP_IMMUTABLE_UNACCENT = "DROP FUNCTION IF EXISTS immutable_unaccent(text);"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_alter_student_guardian_cpf'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        django.contrib.postgres.operations.UnaccentExtension(),
+        migrations.RunSQL(CREATE_IMMUTABLE_UNACCENT, DROP_IMMUTABLE_UNACCENT),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower(students.models.ImmutableUnaccent('name')), name='gin_trgm_ops'), name='student_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower(students.models.ImmutableUnaccent('guardian')), name='gin_trgm_ops'), name='student_guardian_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('cgm', name='gin_trgm_ops'), name='student_cgm_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_student_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['active', 'name', 'id'], name='student_roster_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['active', 'dob', 'id'], name='student_roster_dob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['active', 'city', 'name', 'id'], name='student_roster_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['active', 'state', 'name', 'id'], name='student_roster_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['active', 'gender', 'name', 'id'], name='student_roster_gender_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 12:26
+
+import django.db.models.functions.text
+import students.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_student_roster_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['cgm'], name='student_cgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(models.F('guardian_cpf'), models.F('dob'), django.db.models.functions.text.Lower(students.models.ImmutableUnaccent('name')), name='student_identity_idx'),
+        ),
+    ]
@@ -1,12 +1,79 @@
 import uuid
 from django.db import models
+from django.db.models import Q, Value
+from django.db.models.functions import Greatest, Lower
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.core.validators import RegexValidator
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
 from authentication.models import User
-from utils.validators import validate_cpf
+from utils.validators import normalize_digits, validate_cpf
+from .cache import invalidate_roster
 
 # Create your models here.
 
 
+class ImmutableUnaccent(models.Func):
+    """
+    unaccent() is only STABLE, so it can't be used in an index expression.
+    The immutable_unaccent() wrapper is created by students.0004.
+    """
+
+    function = "immutable_unaccent"
+    output_field = models.TextField()
+
+
+def search_key(expression):
+    """
+    Normalized form used by the trigram indexes: lower(immutable_unaccent(x))
+    """
+    return Lower(ImmutableUnaccent(expression))
+
+
+class StudentQuerySet(models.QuerySet):
+    def search(self, text):
+        """
+        Busca aproximada (acentos e erros de digitação) por nome, responsável e CGM,
+        anotando `similarity`. Usa os índices GIN trigram de Student.
+        """
+        key = search_key(Value(text))
+        return (
+            self.alias(
+                name_key=search_key("name"),
+                guardian_key=search_key("guardian"),
+            )
+            .filter(
+                Q(name_key__trigram_word_similar=key)
+                | Q(guardian_key__trigram_word_similar=key)
+                | Q(cgm__contains=text)
+            )
+            .annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(key, "name_key"),
+                    TrigramWordSimilarity(key, "guardian_key"),
+                    TrigramWordSimilarity(text, "cgm"),
+                )
+            )
+        )
+
+    def duplicates_of(self, name, dob, guardian_cpf, cgm):
+        """
+        Prováveis cadastros do mesmo estudante: mesmo CGM, ou mesmo nome (sem
+        acentos e maiúsculas), data de nascimento e CPF do responsável.
+        Usa student_cgm_idx e student_identity_idx.
+        """
+        return self.alias(name_key=search_key("name")).filter(
+            Q(cgm=cgm)
+            | Q(
+                guardian_cpf=normalize_digits(guardian_cpf),
+                dob=dob,
+                name_key=search_key(Value(name)),
+            )
+        )
+
+
 class Student(models.Model):
     GENDER_CHOICES = (("M", "Male"), ("F", "Female"), ("O", "Other"))
 
@@ -61,10 +128,59 @@ class Student(models.Model):
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=2)
 
+    objects = StudentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                OpClass(search_key("name"), name="gin_trgm_ops"),
+                name="student_name_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(search_key("guardian"), name="gin_trgm_ops"),
+                name="student_guardian_trgm_idx",
+            ),
+            GinIndex(
+                OpClass("cgm", name="gin_trgm_ops"),
+                name="student_cgm_trgm_idx",
+            ),
+            models.Index(fields=["updated_at", "id"], name="student_updated_idx"),
+            # Duplicate detection (duplicates_of): the CPF leads so an import
+            # block can look up all of its guardians at once
+            models.Index(fields=["cgm"], name="student_cgm_idx"),
+            models.Index(
+                "guardian_cpf",
+                "dob",
+                search_key("name"),
+                name="student_identity_idx",
+            ),
+            # Roster (student_list / inactive_student_list): each filter
+            # followed by the ordering it is listed in, so filter + sort +
+            # cursor is a single index range
+            models.Index(
+                fields=["active", "name", "id"], name="student_roster_name_idx"
+            ),
+            models.Index(fields=["active", "dob", "id"], name="student_roster_dob_idx"),
+            models.Index(
+                fields=["active", "city", "name", "id"],
+                name="student_roster_city_idx",
+            ),
+            models.Index(
+                fields=["active", "state", "name", "id"],
+                name="student_roster_state_idx",
+            ),
+            models.Index(
+                fields=["active", "gender", "name", "id"],
+                name="student_roster_gender_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        self.guardian_cpf = "".join(filter(str.isdigit, self.guardian_cpf))
-        self.cep = "".join(filter(str.isdigit, self.cep))
+        self.guardian_cpf = normalize_digits(self.guardian_cpf)
+        self.cep = normalize_digits(self.cep)
         super().save(*args, **kwargs)
+        # Creating, editing, soft deleting and restoring all go through here
+        invalidate_roster()
 
     def soft_delete(self):
         self.active = False
@@ -72,3 +188,21 @@ class Student(models.Model):
 
     def __str__(self):
         return self.name
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_roster_on_delete(sender, **kwargs):
+    # Hard deletes (Student.delete(), queryset.delete(), cascades) skip save()
+    invalidate_roster()
+
+
+@receiver(pre_delete, sender=User)
+def touch_students_of_deleted_user(sender, instance, **kwargs):
+    """
+    created_by/updated_by are then nulled by SET_NULL updates, which neither
+    call save() nor touch updated_at: do both here, in the same transaction
+    """
+    Student.objects.filter(Q(created_by=instance) | Q(updated_by=instance)).update(
+        updated_at=timezone.now()
+    )
+    invalidate_roster()
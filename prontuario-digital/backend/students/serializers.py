@@ -1,9 +1,16 @@
+from collections.abc import Mapping
+
 from rest_framework import serializers
 from .models import Student
 from datetime import date
+from utils.serializers import SparseFieldsMixin
+from utils.validators import normalize_digits
+
 
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Stored as digits only: "123.456.789-09" is accepted like Student.save()
+    DIGIT_FIELDS = ("guardian_cpf", "cep")
 
-class StudentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = [
@@ -42,8 +49,28 @@ class StudentSerializer(serializers.ModelSerializer):
                 )
             return value
 
+    def to_internal_value(self, data):
+        if isinstance(data, Mapping):
+            data = data.copy()
+            for name in self.DIGIT_FIELDS:
+                if isinstance(data.get(name), str):
+                    data[name] = normalize_digits(data[name])
+        return super().to_internal_value(data)
+
 
 class StudentNestedSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = ["id", "name", "cgm", "dob"]
+
+
+class StudentDuplicateSerializer(StudentNestedSerializer):
+    class Meta(StudentNestedSerializer.Meta):
+        fields = StudentNestedSerializer.Meta.fields + ["guardian_cpf", "active"]
+
+
+class StudentSearchSerializer(StudentSerializer):
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(StudentSerializer.Meta):
+        fields = StudentSerializer.Meta.fields + ["similarity"]
@@ -1,3 +1,895 @@
-from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from students.admin import StudentAdmin
+from students.cache import VERSION_KEY
+from students import importer
+from students.importer import import_students, read_rows
+from students.models import Student
+from utils.versioned_cache import current_version
+from authentication.models import User, HealthProfile
+from datetime import date
+from unittest.mock import Mock, patch
+from urllib.parse import parse_qs, urlparse
+from io import BytesIO, StringIO
+from openpyxl import Workbook
+import json
+import tempfile
 
-# Create your tests here.
+
+class StudentSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.health_prof_user = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.health_prof_user,
+            specialty="psychologist",
+            council_number="12345",
+        )
+        cls.manager_user = User.objects.create_user(
+            username="manager",
+            email="manager@example.com",
+            password="testpassword123",
+            role="manager",
+        )
+
+        def create_student(name, cgm, guardian, active=True):
+            return Student.objects.create(
+                name=name,
+                cgm=cgm,
+                dob=date(2010, 1, 1),
+                gender="M",
+                guardian=guardian,
+                guardian_cpf="12345678901",
+                address="Rua Teste",
+                cep="86000000",
+                city="Londrina",
+                state="PR",
+                active=active,
+            )
+
+        cls.joao = create_student("João Silva Santos", "1234567890", "Maria Santos")
+        cls.jose = create_student("José Pereira", "5550001111", "Antônia Pereira")
+        cls.ana = create_student("Ana Beatriz Lima", "9876543210", "Conceição Lima")
+        cls.inactive = create_student(
+            "João Silva Inativo", "1112223334", "Paulo Silva", active=False
+        )
+
+        cls.url = reverse("student_search")
+
+    def search(self, **params):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["id"] for item in response.data]
+
+    def test_search_ignores_accents_and_case(self):
+        self.assertEqual(self.search(q="JOAO SILVA"), [str(self.joao.id)])
+
+    def test_search_tolerates_typos(self):
+        self.assertEqual(self.search(q="joao slva"), [str(self.joao.id)])
+        self.assertEqual(self.search(q="jose perira"), [str(self.jose.id)])
+
+    def test_search_matches_guardian(self):
+        self.assertEqual(self.search(q="conceicao"), [str(self.ana.id)])
+
+    def test_search_matches_partial_cgm(self):
+        self.assertEqual(self.search(q="876543"), [str(self.ana.id)])
+
+    def test_search_excludes_inactive_students(self):
+        self.assertNotIn(str(self.inactive.id), self.search(q="joao silva"))
+
+    def test_search_returns_similarity_ordered(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url, {"q": "santos"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["id"], str(self.joao.id))
+        similarities = [item["similarity"] for item in response.data]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+
+    def test_search_limit(self):
+        self.assertEqual(len(self.search(q="lima", limit=0)), 1)
+        self.assertEqual(len(self.search(q="lima", limit=1)), 1)
+
+    def test_search_requires_term(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"q": "joao", "limit": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_permissions(self):
+        self.client.force_authenticate(user=self.health_prof_user)
+        response = self.client.get(self.url, {"q": "joao"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.manager_user)
+        response = self.client.get(self.url, {"q": "joao"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_search_can_use_trigram_indexes(self):
+        # With only a few rows the planner prefers a seq scan, so disable it
+        # to check that the filter is index-compatible.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = Student.objects.search("joao").explain()
+        self.assertIn("student_name_trgm_idx", plan)
+        self.assertIn("student_guardian_trgm_idx", plan)
+        self.assertIn("student_cgm_trgm_idx", plan)
+
+
+class StudentConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.health_prof_user = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.health_prof_user,
+            specialty="psychologist",
+            council_number="12345",
+        )
+        cls.student = Student.objects.create(
+            name="Test Student",
+            cgm="1234567890",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Test City",
+            state="TS",
+        )
+        cls.list_url = reverse("student_list")
+        cls.detail_url = reverse("student_detail", args=[cls.student.id])
+
+    def _get(self, url, user=None, **headers):
+        self.client.force_authenticate(user=user or self.admin_user)
+        return self.client.get(url, headers=headers)
+
+    def test_list_returns_304_until_changed(self):
+        etag = self._get(self.list_url)["ETag"]
+        response = self._get(self.list_url, if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.student.name = "Renamed Student"
+        self.student.save()
+        response = self._get(self.list_url, if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["name"], "Renamed Student")
+
+    def test_list_changes_after_soft_delete(self):
+        etag = self._get(self.list_url)["ETag"]
+        self.student.soft_delete()
+        response = self._get(self.list_url, if_none_match=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_list_etag_is_scoped_to_role(self):
+        admin_etag = self._get(self.list_url)["ETag"]
+        response = self._get(
+            self.list_url, self.health_prof_user, if_none_match=admin_etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], admin_etag)
+
+    def test_detail_conditional_get(self):
+        response = self._get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        cached = self._get(self.detail_url, if_none_match=response["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        cached = self._get(
+            self.detail_url, if_modified_since=response["Last-Modified"]
+        )
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(self.detail_url, {"city": "Londrina"})
+        response = self._get(self.detail_url, if_none_match=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["city"], "Londrina")
+
+    def test_vary_covers_session_and_token_auth(self):
+        vary = self._get(self.detail_url)["Vary"]
+        for header in ("Accept", "Authorization", "Cookie"):
+            self.assertIn(header, vary)
+
+    def test_if_modified_since_ignored_with_query_params(self):
+        last_modified = self._get(self.list_url)["Last-Modified"]
+        response = self._get(self.list_url, if_modified_since=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(
+            self.list_url,
+            {"city": "Londrina"},
+            headers={"if-modified-since": last_modified},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class StudentSparseFieldsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        for i, active in enumerate([True, True, False]):
+            Student.objects.create(
+                name=f"Student {i}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1, 1),
+                gender="F",
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city="Test City",
+                state="TS",
+                active=active,
+            )
+
+    def _get(self, url, **params):
+        self.client.force_authenticate(user=self.admin_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, context.captured_queries[-1]["sql"]
+
+    def test_list_without_params_is_unchanged(self):
+        response, sql = self._get(reverse("student_list"))
+        self.assertEqual(len(response.data[0]), 16)
+        self.assertIn('"address"', sql)
+
+    def test_list_fields_limit_payload_and_columns(self):
+        response, sql = self._get(reverse("student_list"), fields="id,name,cgm")
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(set(response.data[0]), {"id", "name", "cgm"})
+        self.assertIn('"cgm"', sql)
+        self.assertNotIn('"address"', sql)
+        self.assertNotIn('"guardian_cpf"', sql)
+
+    def test_inactive_list_supports_fields(self):
+        response, sql = self._get(reverse("inactive_student_list"), fields="name")
+        self.assertEqual(response.data, [{"name": "Student 2"}])
+        self.assertNotIn('"address"', sql)
+
+    def test_unknown_field_is_rejected(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse("student_list"), {"fields": "name,nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+
+
+class StudentStreamingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        for i in range(7):
+            Student.objects.create(
+                name=f"Student {i}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1, 1),
+                gender="F",
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city="Test City",
+                state="TS",
+                active=i != 6,
+            )
+
+    def _stream(self, url, **params):
+        self.client.force_authenticate(user=self.admin_user)
+        with patch("utils.streaming.STREAM_CHUNK_SIZE", 4):
+            response = self.client.get(url, {"stream": "true", **params})
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+        return response, chunks
+
+    def test_stream_matches_regular_list(self):
+        url = reverse("student_list")
+        self.client.force_authenticate(user=self.admin_user)
+        regular = json.loads(self.client.get(url).content)
+
+        response, chunks = self._stream(url)
+        self.assertEqual(json.loads(b"".join(chunks)), regular)
+        # "[", two chunks of rows (4 + 2), "]"
+        self.assertEqual(len(chunks), 4)
+        self.assertIn("ETag", response)
+
+    def test_stream_empty_list_is_valid_json(self):
+        Student.objects.update(active=True)
+        _, chunks = self._stream(reverse("inactive_student_list"))
+        self.assertEqual(json.loads(b"".join(chunks)), [])
+
+    def test_inactive_stream_supports_fields(self):
+        _, chunks = self._stream(reverse("inactive_student_list"), fields="name")
+        self.assertEqual(json.loads(b"".join(chunks)), [{"name": "Student 6"}])
+
+
+class StudentRosterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cities = [("Londrina", "PR"), ("Maringá", "PR"), ("Santos", "SP")]
+        for i in range(12):
+            city, state = cities[i % 3]
+            Student.objects.create(
+                name=f"Student {i:02d}",
+                cgm=f"{i:010d}",
+                dob=date(2010, 1 + i, 1),
+                gender="MF"[i % 2],
+                guardian="Guardian",
+                guardian_cpf="12345678909",
+                address="Test Address",
+                cep="12345678",
+                city=city,
+                state=state,
+                active=i < 9,
+            )
+
+    def _get(self, url=None, **params):
+        self.client.force_authenticate(user=self.admin_user)
+        return self.client.get(url or reverse("student_list"), params)
+
+    def _names(self, url=None, **params):
+        response = self._get(url, fields="name", **params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["name"] for item in response.data]
+
+    def test_filters(self):
+        self.assertEqual(
+            self._names(city="Santos"), ["Student 02", "Student 05", "Student 08"]
+        )
+        self.assertEqual(len(self._names(state="pr")), 6)
+        self.assertEqual(len(self._names(gender="f")), 4)
+        self.assertEqual(
+            self._names(dob_from="2010-03-01", dob_to="2010-04-01"),
+            ["Student 02", "Student 03"],
+        )
+        self.assertEqual(
+            self._names(active="false", city="Londrina"), ["Student 09"]
+        )
+
+    def test_invalid_params_are_rejected(self):
+        for params in [
+            {"gender": "X"},
+            {"dob_from": "01/01/2010"},
+            {"ordering": "guardian_cpf"},
+            {"active": "maybe"},
+        ]:
+            response = self._get(**params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.data)
+
+    def test_ordering(self):
+        self.assertEqual(self._names(ordering="-name")[0], "Student 08")
+        self.assertEqual(self._names(ordering="-dob")[0], "Student 08")
+        self.assertEqual(
+            self._names(ordering="city")[:3],
+            ["Student 00", "Student 03", "Student 06"],
+        )
+
+    def test_pages_walk_the_filtered_list_once(self):
+        for url, filters in [
+            (reverse("student_list"), {"state": "PR", "ordering": "-dob"}),
+            (reverse("inactive_student_list"), {"ordering": "-dob"}),
+        ]:
+            seen, cursor = [], None
+            while True:
+                params = dict(filters, page_size=2)
+                if cursor:
+                    params["cursor"] = cursor
+                response = self._get(url, fields="name", **params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                seen += [item["name"] for item in response.data["results"]]
+                if response.data["next"] is None:
+                    break
+                cursor = parse_qs(urlparse(response.data["next"]).query)["cursor"][0]
+            self.assertEqual(seen, self._names(url, **filters))
+
+    def test_filters_and_sorting_use_roster_indexes(self):
+        # A dozen rows are cheaper to sort than to read in index order, so
+        # take the alternatives away to check an index can serve filter + order
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+        active = Student.objects.filter(active=True)
+        for queryset, index in [
+            (active.order_by("name", "id"), "student_roster_name_idx"),
+            (
+                active.filter(dob__gte=date(2010, 3, 1)).order_by("-dob", "-id"),
+                "student_roster_dob_idx",
+            ),
+            (
+                active.filter(city="Santos").order_by("name", "id"),
+                "student_roster_city_idx",
+            ),
+            (
+                active.filter(state="PR").order_by("name", "id"),
+                "student_roster_state_idx",
+            ),
+        ]:
+            plan = queryset[:50].explain()
+            self.assertIn(index, plan)
+            self.assertNotIn("Sort", plan)
+
+
+class StudentRosterCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.student = Student.objects.create(
+            name="Ana",
+            cgm="0000000001",
+            dob=date(2010, 1, 1),
+            gender="F",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Test Address",
+            cep="12345678",
+            city="Londrina",
+            state="PR",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.admin_user)
+
+    def _names(self, **params):
+        response = self.client.get(reverse("student_list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [student["name"] for student in response.data]
+
+    def assertInvalidates(self, write):
+        before = current_version(VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            write()
+        self.assertEqual(len(callbacks), 1)
+        # Bumped before and again after the commit
+        self.assertEqual(current_version(VERSION_KEY), before + 2)
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self._names(), ["Ana"])
+        with patch("utils.serializers.ValuesSerializer.serialize") as serialize:
+            self.assertEqual(self._names(), ["Ana"])
+        serialize.assert_not_called()
+
+        # Other params are cached apart
+        self.assertEqual(self._names(city="Santos"), [])
+
+    def test_304s_see_writes_from_other_workers(self):
+        etag = self.client.get(reverse("student_list"))["ETag"]
+        # One aggregate, no serialization
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("student_list"), headers={"if-none-match": etag}
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A write that did not bump this process' roster version, as one
+        # handled by another worker with a local-memory cache
+        Student.objects.filter(pk=self.student.pk).update(updated_at=timezone.now())
+        response = self.client.get(
+            reverse("student_list"), headers={"if-none-match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        Student.objects.filter(pk=self.student.pk).delete()
+        response = self.client.get(
+            reverse("student_list"), headers={"if-none-match": etag}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_sees_writes_from_other_workers(self):
+        self.assertEqual(self._names(), ["Ana"])
+        # Written without bumping this process' roster version
+        Student.objects.filter(pk=self.student.pk).update(
+            name="Bia", updated_at=timezone.now()
+        )
+        self.assertEqual(self._names(), ["Bia"])
+
+    def test_writes_invalidate(self):
+        self.assertInvalidates(self.student.save)
+        self.assertInvalidates(self.student.soft_delete)
+        self.assertInvalidates(
+            lambda: self.client.put(
+                reverse("restore_inactive_student", args=[self.student.pk])
+            )
+        )
+
+    def test_admin_restore_action_invalidates(self):
+        self.student.soft_delete()
+        self.assertEqual(self._names(), [])
+
+        model_admin = StudentAdmin(Student, admin.site)
+        with patch.object(StudentAdmin, "message_user"):
+            self.assertInvalidates(
+                lambda: model_admin.restore_inactive_student(
+                    None, Student.objects.filter(pk=self.student.pk)
+                )
+            )
+        self.assertEqual(self._names(), ["Ana"])
+
+    def test_hard_delete_invalidates(self):
+        self.assertEqual(self._names(), ["Ana"])
+        self.assertInvalidates(self.student.delete)
+        self.assertEqual(self._names(), [])
+
+    def test_admin_delete_invalidates(self):
+        self.assertEqual(self._names(), ["Ana"])
+        model_admin = StudentAdmin(Student, admin.site)
+        model_admin.delete_queryset(None, Student.objects.filter(pk=self.student.pk))
+        self.assertEqual(self._names(), [])
+
+    def test_deleting_author_invalidates(self):
+        author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        Student.objects.filter(pk=self.student.pk).update(created_by=author)
+        cache.clear()
+        response = self.client.get(reverse("student_list"))
+        self.assertEqual(response.data[0]["created_by"], author.pk)
+
+        updated_at = Student.objects.get(pk=self.student.pk).updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            author.delete()
+        student = self.client.get(reverse("student_list")).data[0]
+        self.assertIsNone(student["created_by"])
+        # Other workers' caches and validators see the change through the table
+        self.assertGreater(
+            Student.objects.get(pk=self.student.pk).updated_at, updated_at
+        )
+
+
+class StudentImportTests(APITestCase):
+    HEADER = "name;cgm;dob;gender;guardian;guardian_cpf;address;cep;city;state"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.health_prof_user = User.objects.create_user(
+            username="healthprof",
+            email="healthprof@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        cls.url = reverse("student_import")
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin_user)
+
+    def _csv(self, *lines, encoding="utf-8"):
+        content = "\n".join((self.HEADER,) + lines).encode(encoding)
+        return SimpleUploadedFile("alunos.csv", content, content_type="text/csv")
+
+    def _post(self, upload, **data):
+        return self.client.post(self.url, {"file": upload, **data}, format="multipart")
+
+    def test_csv_imports_valid_rows_and_reports_invalid_ones(self):
+        response = self._post(
+            self._csv(
+                "Ana;0000000001;05/03/2012;f;Maria;123.456.789-09;Rua A;86010-000;"
+                "Londrina;pr",
+                "Bruno;0000000002;2013-07-21;M;José;11111111111;Rua B;86010000;"
+                "Londrina;PR",
+                ";;;;;;;;;",
+                "Caio;0000000003;31/02/2012;X;João;12345678909;Rua C;123;Cambé;PR",
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {key: response.data[key] for key in ("rows", "created", "invalid")},
+            {"rows": 3, "created": 1, "invalid": 2},
+        )
+        errors = {error["row"]: error["errors"] for error in response.data["errors"]}
+        self.assertEqual(set(errors), {3, 5})
+        self.assertEqual(set(errors[3]), {"guardian_cpf"})
+        self.assertEqual(set(errors[5]), {"dob", "gender", "cep"})
+        self.assertEqual(errors[3]["guardian_cpf"], ["Invalid CPF."])
+        self.assertEqual(errors[5]["cep"], ["CEP must contain 8 digits."])
+
+        student = Student.objects.get()
+        self.assertEqual(student.dob, date(2012, 3, 5))
+        self.assertEqual((student.gender, student.state), ("F", "PR"))
+        self.assertEqual(student.guardian_cpf, "12345678909")
+        self.assertEqual(student.cep, "86010000")
+        self.assertEqual(student.created_by, self.admin_user)
+
+    def test_xlsx_numeric_cells_keep_leading_zeros(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(self.HEADER.split(";"))
+        # Spreadsheet apps turn CPF, CEP and CGM columns into numbers
+        row = ["Ana", 1234, date(2012, 3, 5), "F", "Maria", 9876543229, "Rua A"]
+        sheet.append(row + [1310100, "São Paulo", "SP"])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        upload = SimpleUploadedFile("alunos.xlsx", buffer.getvalue())
+
+        response = self._post(upload)
+        self.assertEqual(response.data["created"], 1)
+        student = Student.objects.get()
+        self.assertEqual(student.cgm, "1234")
+        self.assertEqual(student.guardian_cpf, "09876543229")
+        self.assertEqual(student.cep, "01310100")
+
+    def test_windows_1252_csv(self):
+        line = "Ana;1;05/03/2012;F;Conceição;12345678909;Rua A;86010000;São Paulo;SP"
+        response = self._post(self._csv(line, encoding="cp1252"))
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(Student.objects.get().guardian, "Conceição")
+
+    def test_dry_run_writes_nothing(self):
+        line = "Ana;1;05/03/2012;F;Maria;12345678909;Rua A;86010000;Londrina;PR"
+        response = self._post(self._csv(line), dry_run="true")
+        self.assertEqual(response.data["rows"], 1)
+        self.assertEqual(response.data["created"], 0)
+        self.assertFalse(Student.objects.exists())
+
+    def test_bad_files_are_rejected(self):
+        for upload, detail in [
+            (SimpleUploadedFile("alunos.csv", b"name;cgm\nAna;1"), "Missing columns"),
+            (SimpleUploadedFile("alunos.txt", b"x"), "Unsupported file type"),
+            (SimpleUploadedFile("alunos.xlsx", b"not a zip"), "Invalid XLSX"),
+        ]:
+            response = self._post(upload)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(detail, response.data["detail"])
+
+        response = self.client.post(self.url, {}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_admin_can_import(self):
+        self.client.force_authenticate(user=self.health_prof_user)
+        response = self._post(self._csv())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cpf_and_cep_are_checked_once_per_block(self):
+        lines = [
+            f"Aluno {i};{i};05/03/2012;F;Maria;123.456.789-09;Rua A;86010-000;"
+            "Londrina;PR"
+            for i in range(5)
+        ]
+        checks = {
+            name: Mock(wraps=check) for name, check in importer.DIGIT_CHECKS.items()
+        }
+        with patch.dict(importer.DIGIT_CHECKS, checks):
+            result = import_students(
+                read_rows(BytesIO("\n".join([self.HEADER] + lines).encode()), "a.csv"),
+                batch_size=2,
+            )
+        self.assertEqual(result["created"], 5)
+        for check in checks.values():
+            self.assertEqual(
+                [len(call.args[0]) for call in check.call_args_list], [2, 2, 1]
+            )
+        self.assertEqual(
+            set(Student.objects.values_list("guardian_cpf", "cep")),
+            {("12345678909", "86010000")},
+        )
+
+    def test_import_invalidates_roster_and_batches_inserts(self):
+        lines = [
+            f"Aluno {i};{i};05/03/2012;F;Maria;12345678909;Rua A;86010000;Londrina;PR"
+            for i in range(5)
+        ]
+        before = current_version(VERSION_KEY)
+        with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+            file.write("\n".join([self.HEADER] + lines).encode())
+            file.flush()
+            stdout = StringIO()
+            with CaptureQueriesContext(connection) as context:
+                call_command(
+                    "import_students", file.name, "--batch-size", "2", stdout=stdout
+                )
+        sql = [query["sql"] for query in context.captured_queries]
+        inserts = [query for query in sql if query.startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
+        self.assertIn("5 estudantes criados", stdout.getvalue())
+        self.assertEqual(Student.objects.count(), 5)
+        self.assertGreater(current_version(VERSION_KEY), before)
+
+
+class StudentDuplicateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="testpassword123",
+            role="admin",
+        )
+        cls.student = Student.objects.create(
+            name="João da Silva",
+            cgm="1234567890",
+            dob=date(2012, 3, 5),
+            gender="M",
+            guardian="Maria da Silva",
+            guardian_cpf="12345678909",
+            address="Rua A",
+            cep="86010000",
+            city="Londrina",
+            state="PR",
+        )
+        cls.url = reverse("student_list")
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin_user)
+
+    def _payload(self, **changes):
+        return {
+            "name": "Pedro da Silva",
+            "cgm": "2222222222",
+            "dob": "2012-03-05",
+            "gender": "M",
+            "guardian": "Maria da Silva",
+            "guardian_cpf": "12345678909",
+            "address": "Rua A",
+            "cep": "86010000",
+            "city": "Londrina",
+            "state": "PR",
+            **changes,
+        }
+
+    def test_create_rejects_same_cgm_or_identity(self):
+        for changes in [
+            {"cgm": "1234567890"},
+            # Accents, case and CPF formatting don't hide a duplicate
+            {"name": "JOAO DA SILVA", "guardian_cpf": "123.456.789-09"},
+        ]:
+            response = self.client.post(self.url, self._payload(**changes))
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(
+                [item["id"] for item in response.data["duplicates"]],
+                [str(self.student.id)],
+            )
+        self.assertEqual(Student.objects.count(), 1)
+
+    def test_create_allows_siblings_and_overrides(self):
+        # Same guardian and birthday (twins), different name
+        response = self.client.post(self.url, self._payload())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(
+            f"{self.url}?allow_duplicates=true", self._payload(cgm="1234567890")
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(
+            f"{self.url}?allow_duplicates=maybe", self._payload()
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("allow_duplicates", response.data)
+
+    def test_duplicate_lookup_uses_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = Student.objects.duplicates_of(
+            "Joao da Silva", date(2012, 3, 5), "12345678909", "1234567890"
+        ).explain()
+        self.assertIn("student_cgm_idx", plan)
+        self.assertIn("student_identity_idx", plan)
+
+    def test_import_skips_duplicates(self):
+        header = "name;cgm;dob;gender;guardian;guardian_cpf;address;cep;city;state"
+        rest = "M;Maria;12345678909;Rua A;86010000;Londrina;PR"
+        lines = [
+            f"Joao da Silva;999;05/03/2012;{rest}",
+            f"Ana;1;05/03/2012;{rest}",
+            f"Bia;2;05/03/2012;{rest}",
+            # Same cgm as Ana, in the next block
+            f"Ana Clara;1;06/03/2012;{rest}",
+        ]
+        content = "\n".join([header] + lines).encode()
+
+        result = import_students(
+            read_rows(BytesIO(content), "alunos.csv"), batch_size=2
+        )
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(result["duplicates"], 2)
+        errors = {error["row"]: error["errors"] for error in result["errors"]}
+        self.assertEqual(
+            errors,
+            {
+                2: {
+                    "duplicate": [
+                        "Same name, dob and guardian_cpf as student "
+                        f"{self.student.id}"
+                    ]
+                },
+                5: {"duplicate": ["Same cgm as row 3"]},
+            },
+        )
+
+        response = self.client.post(
+            reverse("student_import"),
+            {
+                "file": SimpleUploadedFile("alunos.csv", content),
+                "allow_duplicates": "true",
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.data["created"], 4)
+        self.assertEqual(response.data["duplicates"], 0)
+
+    def test_report_groups_similar_names(self):
+        for name, cgm, dob in [
+            ("Joao da Silvaa", "1", date(2012, 3, 5)),
+            ("Maria Souza", "2", date(2012, 3, 5)),
+            # Similar name, but nothing else in common
+            ("João da Silva", "3", date(2015, 1, 1)),
+        ]:
+            Student.objects.create(
+                **{
+                    **self._payload(name=name, cgm=cgm, dob=dob),
+                    "guardian_cpf": "52998224725" if cgm == "3" else "12345678909",
+                }
+            )
+        stdout = StringIO()
+        call_command("report_duplicate_students", stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn("Grupo 1", output)
+        self.assertNotIn("Grupo 2", output)
+        self.assertIn("Joao da Silvaa", output)
+        self.assertIn(str(self.student.id), output)
+        self.assertNotIn("Maria Souza", output)
+        self.assertIn("1 grupos, 2 estudantes", output)
@@ -3,6 +3,8 @@ from students import views
 
 urlpatterns = [
     path("api/students/", views.student_list, name="student_list"),
+    path("api/students/search/", views.student_search, name="student_search"),
+    path("api/students/import/", views.student_import, name="student_import"),
     path("api/students/<uuid:pk>/", views.student_detail, name="student_detail"),
     path(
         "api/students/inactive/",
@@ -1,33 +1,228 @@
-from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from datetime import date
+
+from django.db.models import Count, Max, Q
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
+from .cache import get_roster, roster_key, set_roster
+from .importer import ImportFormatError, import_students, read_rows
 from .models import Student
-from .serializers import StudentSerializer
+from .serializers import (
+    StudentDuplicateSerializer,
+    StudentSerializer,
+    StudentSearchSerializer,
+)
 from authentication.permissions import (
     IsAdminUser,
     AdminWriteHealthProfRead,
     IsAdminOrHealthProfessional,
 )
+from utils.conditional import ConditionalValidators
+from utils.middleware import cache_compressed
+from utils.pagination import KeysetPagination, ordering_fields
+from utils.renderers import FAST_RENDERER_CLASSES
+from utils.serializers import SparseFieldset
+from utils.streaming import stream_json_array, wants_stream
 
 # Create your views here.
 
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+# Accepted ?ordering= values, each backed by a student_roster_* index; the id
+# at the end breaks ties so the cursor is deterministic
+STUDENT_ORDERINGS = {
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "dob": ("dob", "id"),
+    "-dob": ("-dob", "-id"),
+    "city": ("city", "name", "id"),
+    "-city": ("-city", "-name", "-id"),
+}
+STUDENT_DEFAULT_ORDERING = "name"
+BOOLEAN_PARAMS = {"true": True, "1": True, "false": False, "0": False}
+
+
+def parse_boolean(params, name, default):
+    value = str(params.get(name, default)).lower()
+    if value not in BOOLEAN_PARAMS:
+        raise serializers.ValidationError({name: ["Use true or false."]})
+    return BOOLEAN_PARAMS[value]
+
+
+def parse_active(request):
+    return parse_boolean(request.query_params, "active", "true")
+
+
+def filter_students(request, queryset):
+    """
+    Filtros do roster: city (exato), state, gender, dob_from e dob_to
+    (AAAA-MM-DD, inclusivos). Retorna o queryset e a ordenação de ?ordering=.
+    """
+    params = request.query_params
+    errors = {}
+
+    if params.get("city"):
+        queryset = queryset.filter(city=params["city"])
+    if params.get("state"):
+        queryset = queryset.filter(state=params["state"].upper())
+
+    gender = params.get("gender", "").upper()
+    if gender:
+        if gender in dict(Student.GENDER_CHOICES):
+            queryset = queryset.filter(gender=gender)
+        else:
+            errors["gender"] = ["Unknown gender."]
+
+    for param, lookup in (("dob_from", "dob__gte"), ("dob_to", "dob__lte")):
+        if params.get(param):
+            try:
+                queryset = queryset.filter(
+                    **{lookup: date.fromisoformat(params[param])}
+                )
+            except ValueError:
+                errors[param] = ["Invalid date. Use YYYY-MM-DD."]
+
+    ordering = STUDENT_ORDERINGS.get(params.get("ordering", STUDENT_DEFAULT_ORDERING))
+    if ordering is None:
+        errors["ordering"] = [f"Use one of: {', '.join(STUDENT_ORDERINGS)}."]
+
+    if errors:
+        raise serializers.ValidationError(errors)
+    return queryset, ordering
+
+
+def student_roster(request, queryset):
+    """
+    Lista de estudantes com os filtros de filter_students, paginação por
+    cursor opcional (cursor, page_size), fields/expand e stream.
+    """
+    sparse = SparseFieldset(request, StudentSerializer)
+    queryset, ordering = filter_students(request, queryset)
+
+    fast = sparse.values_serializer()
+    students = fast.rows(queryset.order_by(*ordering), extra=ordering_fields(ordering))
+
+    paginator = KeysetPagination(ordering=ordering)
+    if paginator.is_requested(request):
+        page = paginator.paginate_queryset(students, request)
+        return paginator.get_paginated_response(fast.serialize(page))
+
+    if wants_stream(request):
+        return stream_json_array(students, fast.serialize)
+
+    return Response(fast.serialize(students), status=status.HTTP_200_OK)
+
 
 @api_view(["GET", "POST"])
+@renderer_classes(FAST_RENDERER_CLASSES)
 @permission_classes([AdminWriteHealthProfRead])
 def student_list(request, format=None):
+    """
+    GET: Lista de estudantes (ativos por padrão), ordenada por nome
+    POST: Cria estudante (apenas admin); 409 com os prováveis cadastros
+          repetidos (mesmo CGM, ou mesmo nome, nascimento e CPF do
+          responsável), a menos que ?allow_duplicates=true
+    Query params: active (opcional) - true (padrão) ou false
+                  city, state, gender, dob_from, dob_to (opcionais) - filtros
+                  ordering (opcional) - name, dob ou city, com - para inverter
+                  cursor, page_size (opcionais) - ativam a paginação por cursor
+                  fields, expand, stream (opcionais)
+    """
     if request.method == "GET":
-        students = Student.objects.filter(active=True).order_by("name")
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        active = parse_active(request)
+
+        # Soft delete also touches updated_at, so the max over all students
+        # changes whenever the active list does; the counts catch hard
+        # deletes. Read from the table, not the (per-process) roster version,
+        # so a write handled by another worker also changes the validators
+        state = Student.objects.aggregate(
+            last_modified=Max("updated_at"),
+            active_count=Count("pk", filter=Q(active=True)),
+            count=Count("pk"),
+        )
+        validators = ConditionalValidators(
+            request, state["last_modified"], state["active_count"], state["count"]
+        )
+        not_modified = validators.not_modified()
+        if not_modified:
+            return not_modified
+
+        queryset = Student.objects.filter(active=active)
+        if KeysetPagination().is_requested(request) or wants_stream(request):
+            return validators.apply(student_roster(request, queryset))
+
+        # The full list, which every screen loads first, is cached serialized
+        cache_key = roster_key(request.query_params, list(state.values()))
+        students = get_roster(cache_key)
+        if students is None:
+            students = student_roster(request, queryset).data
+            set_roster(cache_key, students)
+        return cache_compressed(
+            validators.apply(Response(students, status=status.HTTP_200_OK))
+        )
 
     if request.method == "POST":
+        allow_duplicates = parse_boolean(
+            request.query_params, "allow_duplicates", "false"
+        )
         serializer = StudentSerializer(data=request.data)
         if serializer.is_valid():
+            data = serializer.validated_data
+            duplicates = Student.objects.duplicates_of(
+                data["name"], data["dob"], data["guardian_cpf"], data["cgm"]
+            )
+            if not allow_duplicates and duplicates:
+                return Response(
+                    {
+                        "detail": "Possible duplicate student",
+                        "duplicates": StudentDuplicateSerializer(
+                            duplicates, many=True
+                        ).data,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
             serializer.save(created_by=request.user, updated_by=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def student_import(request, format=None):
+    """
+    Importação em lote de estudantes a partir de uma planilha (apenas admin)
+    Body (multipart): file - .csv ou .xlsx com as colunas name, cgm, dob,
+                      gender, guardian, guardian_cpf, address, cep, city, state
+                      dry_run (opcional) - true só valida, sem gravar
+                      allow_duplicates (opcional) - true grava também as
+                      linhas que repetem um estudante
+    As linhas válidas são gravadas mesmo que outras tenham erro; a resposta
+    traz as contagens e os erros (e duplicados) pelo número da linha (até 100).
+    """
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response(
+            {"detail": "file is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    dry_run = BOOLEAN_PARAMS.get(str(request.data.get("dry_run", "")).lower(), False)
+    allow_duplicates = parse_boolean(request.data, "allow_duplicates", "false")
+
+    try:
+        result = import_students(
+            read_rows(upload, upload.name),
+            user=request.user,
+            dry_run=dry_run,
+            max_errors=IMPORT_MAX_REPORTED_ERRORS,
+            allow_duplicates=allow_duplicates,
+        )
+    except ImportFormatError as error:
+        return Response({"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result, status=status.HTTP_200_OK)
+
+
 @api_view(["GET", "PATCH", "DELETE"])
 @permission_classes([IsAdminUser])
 def student_detail(request, pk, format=None):
@@ -37,8 +232,13 @@ def student_detail(request, pk, format=None):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == "GET":
+        validators = ConditionalValidators(request, student.updated_at)
+        not_modified = validators.not_modified()
+        if not_modified:
+            return not_modified
+
         serializer = StudentSerializer(student)
-        return Response(serializer.data)
+        return validators.apply(Response(serializer.data))
 
     elif request.method == "PATCH":
         serializer = StudentSerializer(student, data=request.data, partial=True)
@@ -60,12 +260,15 @@ def student_detail(request, pk, format=None):
 
 
 @api_view(["GET"])
+@renderer_classes(FAST_RENDERER_CLASSES)
 @permission_classes([IsAdminOrHealthProfessional])
 def inactive_student_list(request, format=None):
+    """
+    Estudantes inativos, com os mesmos filtros, ordenação e paginação da
+    listagem
+    """
     if request.method == "GET":
-        students = Student.objects.filter(active=False).order_by("name")
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data)
+        return student_roster(request, Student.objects.filter(active=False))
 
 
 @api_view(["PUT"])
@@ -87,3 +290,35 @@ def restore_inactive_student(request, pk, format=None):
                 {"detail": "Student is alredy active"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminOrHealthProfessional])
+def student_search(request, format=None):
+    """
+    Busca aproximada de estudantes ativos por nome, responsável ou CGM
+    Query params: q (obrigatório), limit (opcional, padrão 10, máximo 50)
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response(
+            {"detail": "Search term (q) is required"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        limit = int(request.query_params.get("limit", SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        return Response(
+            {"detail": "limit must be an integer"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    students = (
+        Student.objects.filter(active=True)
+        .search(query)
+        .order_by("-similarity", "name")[:limit]
+    )
+    serializer = StudentSearchSerializer(students, many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+from medicalentry.models import MedicalEntry
+
+
+class MedicalEntryTombstoneSerializer(serializers.ModelSerializer):
+    """
+    Entrada excluída: o cliente só precisa saber qual remover
+    """
+
+    class Meta:
+        model = MedicalEntry
+        fields = ["id", "student", "deleted", "updated_at"]
+        read_only_fields = fields
@@ -0,0 +1,6 @@
+from django.urls import path
+from sync import views
+
+urlpatterns = [
+    path("api/sync/", views.sync_changes, name="sync_changes"),
+]
@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from authentication.permissions import IsAdminOrHealthProfessional
+from medicalentry.models import MedicalEntry
+from medicalentry.serializers import MedicalEntrySerializer
+from students.models import Student
+from students.serializers import StudentSerializer
+from utils.pagination import KeysetPagination
+from utils.renderers import FAST_RENDERER_CLASSES
+from .serializers import MedicalEntryTombstoneSerializer
+
+SYNC_ORDERING = ("updated_at", "id")
+STREAMS = {"students": Student, "entries": MedicalEntry}
+
+
+class SyncPagination(KeysetPagination):
+    ordering = SYNC_ORDERING
+    page_size = 500
+    max_page_size = 2000
+
+
+def is_stream_position(paginator, model, position):
+    """
+    [updated_at, id] como o sync devolve: data e hora com fuso e um id válido
+    para `model`. Um cursor alterado à mão pode trazer qualquer coisa.
+    """
+    if not paginator.is_position(position):
+        return False
+    try:
+        synced_until = parse_datetime(str(position[0]))
+        model._meta.pk.to_python(position[1])
+    except (ValueError, ValidationError):
+        return False
+    return synced_until is not None and timezone.is_aware(synced_until)
+
+
+def decode_sync_cursor(paginator, encoded):
+    if not encoded:
+        return dict.fromkeys(STREAMS)
+
+    cursor = paginator.decode_value(encoded)
+    if not isinstance(cursor, dict) or not all(
+        cursor.get(stream) is None
+        or is_stream_position(paginator, model, cursor.get(stream))
+        for stream, model in STREAMS.items()
+    ):
+        raise NotFound(paginator.invalid_cursor_message)
+    return {stream: cursor.get(stream) for stream in STREAMS}
+
+
+def cursor_expired(cursor):
+    """
+    Tombstones de entradas excluídas há mais que a retenção vão para o
+    arquivo; um cursor mais antigo que isso pode já ter perdido algum.
+    """
+    position = cursor["entries"]
+    if position is None:
+        return False
+    # Already checked by decode_sync_cursor
+    synced_until = parse_datetime(str(position[0]))
+    retention = timedelta(days=settings.MEDICAL_ENTRY_ARCHIVE_RETENTION_DAYS)
+    return synced_until < timezone.now() - retention
+
+
+def serialize_entry(entry):
+    if entry.deleted:
+        return MedicalEntryTombstoneSerializer(entry).data
+    return MedicalEntrySerializer(entry).data
+
+
+@api_view(["GET"])
+@renderer_classes(FAST_RENDERER_CLASSES)
+@permission_classes([IsAdminOrHealthProfessional])
+def sync_changes(request):
+    """
+    Sincronização incremental de estudantes e entradas de prontuário
+    Query params: cursor (opcional) - devolvido pela chamada anterior; sem ele
+                  a sincronização começa do zero
+                  page_size (opcional) - máximo de itens por tipo
+    Inclui criados, alterados, desativados/restaurados e entradas excluídas
+    (como tombstones), respeitando a especialidade do health_prof.
+    Enquanto has_more for true, chame novamente com o novo cursor.
+    Cursores mais antigos que a retenção do arquivo recebem 410: o cliente
+    deve sincronizar do zero.
+    """
+    paginator = SyncPagination()
+    paginator.page_size = paginator.get_page_size(request)
+    cursor = decode_sync_cursor(
+        paginator, request.query_params.get(paginator.cursor_query_param)
+    )
+    if cursor_expired(cursor):
+        return Response(
+            {"detail": "Sync cursor expired, sync again from scratch"},
+            status=status.HTTP_410_GONE,
+        )
+
+    # Rows are stamped before their transaction commits, so only hand out
+    # changes older than the safety window: a slow commit can't land behind
+    # a cursor that was already returned
+    horizon = timezone.now() - timedelta(seconds=settings.SYNC_SAFETY_WINDOW_SECONDS)
+
+    querysets = {
+        "students": Student.objects.filter(updated_at__lte=horizon),
+        "entries": MedicalEntry.all_with_deleted.visible_to(request.user).filter(
+            updated_at__lte=horizon
+        ),
+    }
+
+    data = {}
+    has_more = False
+    for stream in STREAMS:
+        items, stream_has_more = paginator.page_after(
+            querysets[stream], cursor[stream]
+        )
+        if items:
+            cursor[stream] = paginator.position_of(items[-1])
+        has_more = has_more or stream_has_more
+        data[stream] = items
+
+    return Response(
+        {
+            "students": StudentSerializer(data["students"], many=True).data,
+            "entries": [serialize_entry(entry) for entry in data["entries"]],
+            "cursor": paginator.encode_cursor(cursor),
+            "has_more": has_more,
+        },
+        status=status.HTTP_200_OK,
+    )
@@ -0,0 +1,89 @@
+import hashlib
+import json
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def viewer_scope(user):
+    """
+    Papel e especialidade de quem faz a requisição: duas pessoas com escopos
+    diferentes nunca podem compartilhar o mesmo validador.
+    """
+    specialty = ""
+    if user.role == "health_prof":
+        profile = getattr(user, "health_profile", None)
+        specialty = profile.specialty if profile else ""
+    return user.role, specialty
+
+
+class ConditionalValidators:
+    """
+    ETag / Last-Modified de um resultado, calculados a partir de um estado
+    barato (ex.: max(updated_at) e contagens) em vez do corpo serializado.
+
+    O ETag também inclui caminho, query params, Accept e o escopo do usuário,
+    então cursores, filtros e formatos diferentes têm validadores diferentes.
+    If-Modified-Since só compara datas, então só vale sem query params e
+    quando o resultado não depende do escopo (`scoped=False`).
+    """
+
+    def __init__(self, request, last_modified=None, *state, scoped=False):
+        self.request = request
+        self.last_modified = last_modified
+        self.date_validates = not scoped and not request.GET
+        raw = json.dumps(
+            [
+                request.path,
+                sorted(request.GET.lists()),
+                request.headers.get("Accept", ""),
+                viewer_scope(request.user),
+                last_modified,
+                state,
+            ],
+            default=str,
+            separators=(",", ":"),
+        )
+        self.etag = '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def is_not_modified(self):
+        if self.request.method not in ("GET", "HEAD"):
+            return False
+
+        if_none_match = self.request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            # Weak comparison: compression turns the ETag into W/"..."
+            etags = [etag.removeprefix("W/") for etag in parse_etags(if_none_match)]
+            return "*" in etags or self.etag in etags
+
+        if_modified_since = self.request.headers.get("If-Modified-Since")
+        if (
+            if_modified_since
+            and self.last_modified is not None
+            and self.date_validates
+        ):
+            since = parse_http_date_safe(if_modified_since)
+            return since is not None and int(self.last_modified.timestamp()) <= since
+
+        return False
+
+    def not_modified(self):
+        """
+        Resposta 304 se o cliente já tem a versão atual, senão None
+        """
+        if not self.is_not_modified():
+            return None
+        return self.apply(Response(status=status.HTTP_304_NOT_MODIFIED))
+
+    def apply(self, response):
+        response["ETag"] = self.etag
+        if self.last_modified is not None:
+            response["Last-Modified"] = http_date(self.last_modified.timestamp())
+        # Dados de prontuário: o navegador pode guardar, mas deve revalidar
+        patch_cache_control(response, private=True, no_cache=True)
+        # Session (cookie) or token authentication, depending on the client
+        patch_vary_headers(response, ("Accept", "Authorization", "Cookie"))
+        return response
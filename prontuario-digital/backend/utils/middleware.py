@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional
+    zstandard = None
+
+KEY_PREFIX = "compressed"
+
+# Only the API's own payloads. HTML (admin, browsable API, Swagger UI)
+# carries a CSRF token next to reflected input, which is what BREACH needs;
+# XLSX and other binary formats are already compressed
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "application/msgpack")
+
+
+class GzipCodec:
+    name = "gzip"
+    level = 6
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def stream(self, chunks):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            # Flush every chunk so a streamed list keeps its first byte early
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class BrotliCodec:
+    name = "br"
+    # Beyond 4-5 brotli gets much slower without shrinking our JSON further
+    level = 4
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.level)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class ZstdCodec:
+    name = "zstd"
+    level = 3
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self, chunks):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        yield compressor.flush()
+
+
+# Server preference, used to break ties between equal q-values
+CODECS = [
+    codec
+    for codec, available in (
+        (BrotliCodec(), brotli is not None),
+        (ZstdCodec(), zstandard is not None),
+        (GzipCodec(), True),
+    )
+    if available
+]
+
+
+def negotiate(accept_encoding, codecs=None):
+    """
+    Melhor codificação aceita pelo cliente (maior q; empate pela ordem de
+    CODECS), ou None para enviar sem compressão.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for codec in CODECS if codecs is None else codecs:
+        weight = weights.get(codec.name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = codec, weight
+    return best
+
+
+def cache_compressed(response):
+    """
+    Marca uma resposta montada a partir de um cache: o corpo comprimido fica
+    guardado (pelo hash do conteúdo) e os próximos hits não comprimem de novo.
+    """
+    response.cache_compressed = True
+    return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    gzip / brotli / zstd conforme o Accept-Encoding, para respostas JSON e
+    MessagePack da API a partir de COMPRESSION_MIN_SIZE bytes. Streaming é
+    sempre comprimido (o tamanho não é conhecido). HTML (admin, API
+    navegável) e formatos já comprimidos, como XLSX, passam direto.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        content_type = response.get("Content-Type", "").partition(";")[0].strip()
+        if content_type.lower() not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codec = negotiate(request.headers.get("Accept-Encoding", ""))
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            response.streaming_content = codec.stream(response.streaming_content)
+            # The length is no longer known
+            del response.headers["Content-Length"]
+        else:
+            compressed = self.compress(response, codec)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # A strong ETag names the exact bytes; the encoded body is a variant
+        # of it (RFC 9110 8.8.1), and If-None-Match uses weak comparison
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+
+        response.headers["Content-Encoding"] = codec.name
+        return response
+
+    def compress(self, response, codec):
+        if not getattr(response, "cache_compressed", False):
+            return codec.compress(response.content)
+
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        key = f"{KEY_PREFIX}:{codec.name}:{digest}"
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = codec.compress(response.content)
+            cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+        return compressed
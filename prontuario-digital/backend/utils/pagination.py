@@ -0,0 +1,154 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def ordering_fields(ordering):
+    # Read back from each row by the cursor, so kept even with fields=
+    return [field.lstrip("-") for field in ordering]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por keyset (cursor opaco) sobre uma ordenação determinística.
+
+    O cursor guarda os valores das colunas de ordenação do último item da
+    página, e a próxima página é buscada com um filtro "depois deste item",
+    então o custo de cada página não depende da profundidade.
+    A última coluna de `ordering` precisa ser única (normalmente o id).
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 200
+    ordering = ("-id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering=None, page_size=None, max_page_size=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+        if max_page_size is not None:
+            self.max_page_size = max_page_size
+        self.next_position = None
+
+    def is_requested(self, request):
+        """
+        Paginação é opt-in: sem cursor ou page_size a view mantém a resposta antiga
+        """
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        results, has_next = self.page_after(queryset, self.decode_cursor(request))
+        self.next_position = self.position_of(results[-1]) if has_next else None
+        return results
+
+    def page_after(self, queryset, position):
+        """
+        Uma página de `queryset` depois de `position` (None = do início).
+        Retorna (itens, has_next).
+        """
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position))
+            except (DjangoValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to know if there is a next page
+        results = list(queryset[: self.page_size + 1])
+        has_next = len(results) > self.page_size
+        return results[: self.page_size], has_next
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def encode_cursor(self, value):
+        raw = json.dumps(value, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        position = self.decode_value(encoded)
+        if not self.is_position(position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def decode_value(self, encoded):
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            return json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def is_position(self, value):
+        return isinstance(value, list) and len(value) == len(self.ordering)
+
+    def position_of(self, item):
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(item, dict):
+            return [item[name] for name in names]
+        return [getattr(item, name) for name in names]
+
+    def _after(self, position):
+        """
+        Monta (a < x) OR (a = x AND b < y) OR ... para a ordenação configurada.
+        O limite redundante na primeira coluna permite que o índice comece a
+        varredura já na posição do cursor em vez de filtrar as linhas anteriores.
+        """
+        first = self.ordering[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+
+        return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & condition
@@ -0,0 +1,57 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Tipos que o orjson/msgpack não conhecem (Decimal, lazy strings, QuerySet...)
+# caem no mesmo encoder que o JSONRenderer do DRF usa
+fallback_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer com orjson: mesmos bytes do renderer padrão do DRF (compacto,
+    UTF-8). date/datetime passam pelo encoder do DRF, que corta os
+    microssegundos; pedidos com indentação (Accept: ...; indent=4) ou com
+    UNICODE_JSON desligado usam o renderer padrão.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=fallback_encoder.default, option=self.options)
+        # Same escaping as DRF: U+2028/2029 are valid JSON but break JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    application/msgpack, escolhido por negociação de conteúdo (Accept).
+    Os valores têm a mesma forma do JSON: UUID, date e datetime viram strings.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=fallback_encoder.default, use_bin_type=True)
+
+
+# Opt-in (@renderer_classes) for the large list endpoints; everything else
+# keeps the settings default, with DRF's JSONRenderer
+FAST_RENDERER_CLASSES = [ORJSONRenderer, MessagePackRenderer, BrowsableAPIRenderer]
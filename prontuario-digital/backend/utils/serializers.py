@@ -0,0 +1,219 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer que aceita `fields` (campos a manter) e `expand` (relações
+    aninhadas a serializar por completo). Relações aninhadas fora de `expand`
+    viram apenas o id.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        for name, field in list(self.fields.items()):
+            if isinstance(field, serializers.BaseSerializer) and name not in (
+                expand or ()
+            ):
+                kwargs = {"source": field.source} if field.source != name else {}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, **kwargs
+                )
+
+
+class SparseFieldset:
+    """
+    Lê `fields=` / `expand=` da requisição e cria o serializer correspondente.
+    Sem nenhum dos dois parâmetros a resposta não muda.
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def __init__(self, request, serializer_class):
+        self.serializer_class = serializer_class
+        self.fields = self._parse(request, self.fields_query_param)
+        self.expand = self._parse(request, self.expand_query_param)
+        self.requested = self.fields is not None or self.expand is not None
+        if self.requested:
+            self.validate()
+
+    def validate(self):
+        available = self.serializer_class().fields
+        nested = {
+            name
+            for name, field in available.items()
+            if isinstance(field, serializers.BaseSerializer)
+        }
+        errors = {}
+        unknown = set(self.fields or ()) - set(available)
+        if unknown:
+            errors[self.fields_query_param] = [
+                f"Unknown field(s): {', '.join(sorted(unknown))}"
+            ]
+        unknown = set(self.expand or ()) - nested
+        if unknown:
+            errors[self.expand_query_param] = [
+                f"Cannot expand: {', '.join(sorted(unknown))}"
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    def _parse(self, request, param):
+        if param not in request.query_params:
+            return None
+        raw = request.query_params.get(param, "")
+        return [name.strip() for name in raw.split(",") if name.strip()]
+
+    def cache_key(self):
+        if not self.requested:
+            return None
+        return (self.fields, sorted(self.expand or ()))
+
+    def get_serializer(self, instance, **kwargs):
+        if self.requested:
+            kwargs.update(fields=self.fields, expand=self.expand or ())
+        return self.serializer_class(instance, **kwargs)
+
+    def values_serializer(self):
+        """
+        Caminho rápido (ValuesSerializer) para os campos pedidos: o
+        values_list() resultante só busca essas colunas e só faz JOIN com as
+        relações expandidas.
+        """
+        return ValuesSerializer(self.get_serializer(None))
+
+
+class ValuesSerializer:
+    """
+    Caminho rápido de leitura: monta o mesmo JSON de um ModelSerializer a partir
+    de values_list(), sem instanciar modelos nem passar pela maquinaria de
+    campos do DRF por linha.
+
+    O plano é montado uma vez a partir de uma instância do serializer (já
+    com fields/expand aplicados). Tipos de campo sem conversão conhecida geram
+    TypeError na montagem, em vez de uma saída diferente da do DRF.
+    """
+
+    def __init__(self, serializer):
+        self.paths = []
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.plan = self._compile(serializer, prefix="")
+
+    def rows(self, queryset, extra=()):
+        """
+        values_list com os caminhos do plano, mais `extra` (ex.: ordenação e
+        anotações lidas pelo cursor) no fim, para não mudar os índices.
+        """
+        names = self.paths + [name for name in extra if name not in self.paths]
+        # Named rows only when the caller reads columns by name (cursor)
+        return queryset.values_list(*names, named=bool(extra))
+
+    def serialize(self, rows):
+        plan = self.plan
+        return [_build(plan, row) for row in rows]
+
+    def data(self, queryset):
+        return self.serialize(self.rows(queryset))
+
+    def _index(self, path):
+        if path not in self.paths:
+            self.paths.append(path)
+        return self.paths.index(path)
+
+    def _compile(self, serializer, prefix):
+        """
+        Lista de (nome, índice na linha, conversor, plano aninhado), com os
+        índices e conversores resolvidos uma vez para todas as linhas.
+        """
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            path = prefix + "__".join(field.source_attrs)
+            if isinstance(field, serializers.ListSerializer):
+                raise TypeError(f"{name}: many=True is not supported")
+
+            index = self._index(path)
+            if isinstance(field, serializers.BaseSerializer):
+                # The FK column tells a null relation apart from an empty one
+                plan.append((name, index, None, self._compile(field, path + "__")))
+            else:
+                plan.append((name, index, self._converter(field), None))
+        return plan
+
+    def _converter(self, field):
+        """
+        Reproduz o to_representation do DRF para os tipos usados nos
+        serializers do projeto; None = valor do banco já é a representação.
+        """
+        if isinstance(field, serializers.DateTimeField):
+            if not _is_iso(getattr(field, "format", api_settings.DATETIME_FORMAT)):
+                return field.to_representation
+            field_timezone = getattr(field, "timezone", self.timezone)
+            return lambda value: _iso_datetime(value, field_timezone)
+        if isinstance(field, serializers.DateField):
+            if not _is_iso(getattr(field, "format", api_settings.DATE_FORMAT)):
+                return field.to_representation
+            return lambda value: value.isoformat()
+        if isinstance(field, serializers.UUIDField):
+            if field.uuid_format == "hex_verbose":
+                return str
+            return field.to_representation
+        if isinstance(field, serializers.FloatField):
+            return float
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return field.pk_field.to_representation
+            return None
+        if isinstance(
+            field,
+            (
+                serializers.CharField,
+                serializers.IntegerField,
+                serializers.BooleanField,
+                serializers.ChoiceField,
+                serializers.ReadOnlyField,
+            ),
+        ):
+            return None
+        raise TypeError(
+            f"{field.field_name}: {type(field).__name__} has no fast-path converter"
+        )
+
+
+def _is_iso(output_format):
+    return isinstance(output_format, str) and output_format.lower() == ISO_8601
+
+
+def _iso_datetime(value, field_timezone):
+    # Same as DRF's DateTimeField.to_representation with the ISO 8601 format
+    if field_timezone is not None and timezone.is_aware(value):
+        value = value.astimezone(field_timezone)
+    text = value.isoformat()
+    if text.endswith("+00:00"):
+        text = text[:-6] + "Z"
+    return text
+
+
+def _build(plan, row):
+    # One dict per row (and per expanded relation), in the serializer's order
+    data = {}
+    for name, index, convert, nested in plan:
+        value = row[index]
+        if value is not None:
+            if nested is not None:
+                value = _build(nested, row)
+            elif convert is not None:
+                value = convert(value)
+        data[name] = value
+    return data
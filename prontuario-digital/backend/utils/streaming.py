@@ -0,0 +1,46 @@
+from django.http import StreamingHttpResponse
+from utils.renderers import ORJSONRenderer
+
+STREAM_QUERY_PARAM = "stream"
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request):
+    """
+    Streaming é opt-in (?stream=true): a resposta deixa de ser um Response do
+    DRF, então negociação de formato e a API navegável não se aplicam.
+    """
+    return request.query_params.get(STREAM_QUERY_PARAM, "").lower() in (
+        "1",
+        "true",
+    )
+
+
+def stream_json_array(queryset, serialize, chunk_size=None):
+    """
+    Itera `queryset` com cursor no servidor e serializa `chunk_size` linhas por
+    vez com `serialize(linhas) -> lista`, emitindo um array JSON válido.
+    A memória fica limitada a um chunk, independente do total de linhas.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    renderer = ORJSONRenderer()
+
+    def render(batch):
+        # Render the chunk as an array and drop its brackets
+        return renderer.render(serialize(batch))[1:-1]
+
+    def generate():
+        yield b"["
+        separator = b""
+        batch = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) == chunk_size:
+                yield separator + render(batch)
+                separator = b","
+                batch = []
+        if batch:
+            yield separator + render(batch)
+        yield b"]"
+
+    return StreamingHttpResponse(generate(), content_type="application/json")
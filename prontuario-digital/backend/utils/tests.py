@@ -1,3 +1,446 @@
-from django.test import TestCase
+import gzip
+import json
+import msgpack
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+from uuid import uuid4
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from authentication.models import User, HealthProfile
+from medicalentry.models import MedicalEntry
+from medicalentry.serializers import MedicalEntrySerializer
+from reports.models import ReportLog
+from reports.serializers import ReportLogSerializer
+from students.models import Student
+from students.serializers import StudentSerializer
+from utils.middleware import GzipCodec, brotli, negotiate, zstandard
+from utils.renderers import MessagePackRenderer, ORJSONRenderer
+from utils.serializers import ValuesSerializer
+from utils.validators import check_ceps, check_cpfs, normalize_digits, validate_cpf
+from django.core.exceptions import ValidationError
+from datetime import date
 
-# Create your tests here.
+
+class ValuesSerializerTests(TestCase):
+    """
+    O caminho rápido precisa gerar exatamente os mesmos bytes que o DRF
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+            first_name="Psycho",
+            last_name="Prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.student = Student.objects.create(
+            name="Estudante Ação",
+            cgm="1234567890",
+            dob=date(2010, 2, 3),
+            gender="F",
+            guardian="Responsável",
+            guardian_cpf="12345678909",
+            address="Rua Teste",
+            cep="12345678",
+            city="Londrina",
+            state="PR",
+            created_by=cls.psychologist,
+        )
+        Student.objects.create(
+            name="Sem Autor",
+            cgm="0987654321",
+            dob=date(2011, 4, 5),
+            gender="O",
+            guardian="Guardian",
+            guardian_cpf="12345678909",
+            address="Rua Teste",
+            cep="12345678",
+            city="Londrina",
+            state="PR",
+        )
+        MedicalEntry.objects.create(
+            student=cls.student, healthpro=cls.psychologist, description="Sessão"
+        )
+        deleted = MedicalEntry.objects.create(
+            student=cls.student,
+            healthpro=cls.psychologist,
+            description="Errada",
+            notes="Com notas",
+        )
+        deleted.soft_delete(user=cls.psychologist, reason="Duplicada")
+        ReportLog.objects.create(
+            user_id=cls.psychologist,
+            report_type=ReportLog.ReportTypes.GENERAL_MONTHLY,
+        )
+
+    def assertSameBytes(self, serializer_class, queryset, **kwargs):
+        renderer = JSONRenderer()
+        expected = renderer.render(
+            serializer_class(queryset, many=True, **kwargs).data
+        )
+        fast = ValuesSerializer(serializer_class(**kwargs))
+        self.assertEqual(renderer.render(fast.data(queryset)), expected)
+
+    def test_medical_entry_output_is_identical(self):
+        self.assertSameBytes(
+            MedicalEntrySerializer, MedicalEntry.all_with_deleted.order_by("id")
+        )
+
+    def test_sparse_medical_entry_output_is_identical(self):
+        self.assertSameBytes(
+            MedicalEntrySerializer,
+            MedicalEntry.all_with_deleted.order_by("id"),
+            fields=["id", "student", "healthpro", "deleted_by", "delete_date"],
+            expand=["healthpro"],
+        )
+
+    def test_student_output_is_identical(self):
+        self.assertSameBytes(StudentSerializer, Student.objects.order_by("name"))
+
+    def test_report_log_output_is_identical(self):
+        self.assertSameBytes(ReportLogSerializer, ReportLog.objects.order_by("date"))
+
+    def test_unsupported_field_fails_at_compile_time(self):
+        class WithMethod(serializers.ModelSerializer):
+            extra = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Student
+                fields = ["id", "extra"]
+
+        with self.assertRaises(TypeError):
+            ValuesSerializer(WithMethod())
+
+
+class RendererTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.student = Student.objects.create(
+            name="Estudante Ação",
+            cgm="1234567890",
+            dob=date(2010, 2, 3),
+            gender="F",
+            guardian="Responsável",
+            guardian_cpf="12345678909",
+            address="Rua Teste",
+            cep="12345678",
+            city="Londrina",
+            state="PR",
+        )
+        for i in range(3):
+            MedicalEntry.objects.create(
+                student=cls.student,
+                healthpro=cls.psychologist,
+                description=f"Sessão {i} \u2028 ok",
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.psychologist)
+
+    def test_orjson_matches_drf_renderer(self):
+        data = {
+            "id": uuid4(),
+            "when": timezone.now(),
+            "day": date(2024, 5, 6),
+            "amount": Decimal("1.50"),
+            "text": "Acentuação \u2028 linha",
+            "nested": [{"a": 1, "b": None, "c": 1.5, "d": True}],
+            1: "chave numérica",
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_falls_back_to_drf_renderer(self):
+        data = {"a": [1, 2]}
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+    def test_list_response_is_byte_identical(self):
+        response = self.client.get(reverse("medical_entry_list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+
+    def test_other_endpoints_keep_drf_json_renderer(self):
+        entry = MedicalEntry.objects.first()
+        url = reverse("medical_entry_detail", args=[entry.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIs(type(response.accepted_renderer), JSONRenderer)
+        response = self.client.get(url, HTTP_ACCEPT=MessagePackRenderer.media_type)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+
+    def test_msgpack_is_negotiated_by_accept(self):
+        url = reverse("medical_entry_by_student", args=[self.student.id])
+        json_response = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT=MessagePackRenderer.media_type)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json_response.json())
+        # Different representations must not share a validator
+        self.assertNotEqual(response["ETag"], json_response["ETag"])
+
+    def test_msgpack_format_suffix(self):
+        response = self.client.get(reverse("medical_entry_list"), {"format": "msgpack"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(msgpack.unpackb(response.content)), 3)
+
+    def test_excel_reports_keep_their_renderer(self):
+        response = self.client.get(reverse("monthly_report"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["Content-Type"],
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.psychologist = User.objects.create_user(
+            username="psycho",
+            email="psycho@example.com",
+            password="testpassword123",
+            role="health_prof",
+        )
+        HealthProfile.objects.create(
+            user=cls.psychologist, specialty="psychologist", council_number="1"
+        )
+        cls.student = Student.objects.create(
+            name="Estudante",
+            cgm="1234567890",
+            dob=date(2010, 2, 3),
+            gender="F",
+            guardian="Responsável",
+            guardian_cpf="12345678909",
+            address="Rua Teste",
+            cep="12345678",
+            city="Londrina",
+            state="PR",
+        )
+        MedicalEntry.objects.bulk_create(
+            MedicalEntry(
+                student=cls.student,
+                healthpro=cls.psychologist,
+                specialty="psychologist",
+                description=f"Sessão de acompanhamento {i}",
+            )
+            for i in range(20)
+        )
+        cls.list_url = reverse("medical_entry_list")
+        cls.timeline_url = reverse("medical_entry_by_student", args=[cls.student.id])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.psychologist)
+
+    def test_large_response_is_gzipped(self):
+        plain = self.client.get(self.list_url)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+
+    def test_without_accept_encoding_nothing_changes(self):
+        response = self.client.get(self.list_url)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @override_settings(COMPRESSION_MIN_SIZE=10**6)
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        plain = self.client.get(self.list_url)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    @skipUnless(zstandard, "zstandard is not installed")
+    def test_zstd(self):
+        plain = self.client.get(self.list_url)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING="zstd")
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        self.assertEqual(
+            zstandard.ZstdDecompressor().decompress(response.content), plain.content
+        )
+
+    def test_negotiation_follows_q_values(self):
+        self.assertEqual(negotiate("gzip;q=1, br;q=0.5").name, "gzip")
+        self.assertEqual(negotiate("*;q=0, gzip").name, "gzip")
+        self.assertIsNone(negotiate("identity"))
+        self.assertIsNone(negotiate("gzip;q=0"))
+        self.assertIsNone(negotiate(""))
+
+    def test_streamed_response_is_compressed(self):
+        plain = b"".join(
+            self.client.get(self.list_url, {"stream": "true"}).streaming_content
+        )
+        with patch("utils.streaming.STREAM_CHUNK_SIZE", 4):
+            response = self.client.get(
+                self.list_url, {"stream": "true"}, HTTP_ACCEPT_ENCODING="gzip"
+            )
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            body = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), plain)
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_html_pages_are_not_compressed(self):
+        # CSRF token + reflected input: compressing them would expose BREACH
+        self.client.logout()
+        response = self.client.get(
+            reverse("admin:login"), {"next": "/admin/?q=x"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertIn(b"csrfmiddlewaretoken", response.content)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+        self.client.force_authenticate(user=self.psychologist)
+        response = self.client.get(
+            self.list_url, HTTP_ACCEPT="text/html", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertTrue(response["Content-Type"].startswith("text/html"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_xlsx_reports_are_not_compressed(self):
+        response = self.client.get(
+            reverse("monthly_report"), HTTP_ACCEPT_ENCODING="gzip, br, zstd"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_cached_timeline_is_compressed_once(self):
+        with patch.object(
+            GzipCodec, "compress", autospec=True, side_effect=GzipCodec.compress
+        ) as compress:
+            first = self.client.get(self.timeline_url, HTTP_ACCEPT_ENCODING="gzip")
+            second = self.client.get(self.timeline_url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(
+            json.loads(gzip.decompress(second.content))["student_name"], "Estudante"
+        )
+
+    def test_compressed_etag_still_validates(self):
+        response = self.client.get(self.timeline_url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+        response = self.client.get(
+            self.timeline_url,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+def reference_cpf_is_valid(cpf):
+    # Textbook definition: each check digit is 11 - (sum % 11), or 0 if >= 10
+    digits = [int(digit) for digit in cpf]
+    for position in (9, 10):
+        total = sum(d * w for d, w in zip(digits, range(position + 1, 1, -1)))
+        check = 11 - total % 11
+        if digits[position] != (0 if check >= 10 else check):
+            return False
+    return len(set(cpf)) > 1
+
+
+class ValidatorTests(TestCase):
+    def test_check_cpfs_normalizes_and_reports_per_item(self):
+        results = check_cpfs(
+            ["123.456.789-09", "12345678900", "1234567890", "111.111.111-11", 5]
+        )
+        self.assertEqual(
+            [(result.normalized, result.error) for result in results],
+            [
+                ("12345678909", None),
+                ("12345678900", "Invalid CPF."),
+                ("1234567890", "CPF must contain 11 digits."),
+                ("11111111111", "Invalid CPF."),
+                ("5", "CPF must contain 11 digits."),
+            ],
+        )
+        self.assertEqual(results[0].value, "123.456.789-09")
+        self.assertEqual([result.valid for result in results], [True] + [False] * 4)
+
+    def test_check_ceps(self):
+        results = check_ceps(["86010-000", "8601000", "01310100"])
+        self.assertEqual(
+            [(result.normalized, result.valid) for result in results],
+            [("86010000", True), ("8601000", False), ("01310100", True)],
+        )
+
+    def test_second_check_digit_zero_when_remainder_is_one(self):
+        # The old validator expected 10 here and rejected the CPF
+        validate_cpf("01234567890")
+        self.assertTrue(check_cpfs(["012.345.678-90"])[0].valid)
+
+    def test_validate_cpf_messages(self):
+        for cpf, message in [
+            ("1234567890", "CPF must contain 11 digits."),
+            ("123.456.789", "CPF must contain 11 digits."),
+            ("12345678900", "Invalid CPF."),
+            ("00000000000", "Invalid CPF."),
+        ]:
+            with self.assertRaisesMessage(ValidationError, message):
+                validate_cpf(cpf)
+
+    def test_normalize_digits(self):
+        self.assertEqual(normalize_digits("123.456.789-09"), "12345678909")
+        self.assertEqual(normalize_digits(" 86010-000 "), "86010000")
+        # Non-ASCII digits (e.g. Arabic-Indic) are not CPF digits
+        self.assertEqual(normalize_digits("١٢٣"), "")
+
+    def test_agrees_with_reference_algorithm(self):
+        cpfs = [f"{number:011d}" for number in range(0, 10**11, 7_654_321)]
+        cpfs += [cpf[:9] + f"{check:02d}" for cpf in cpfs[:50] for check in range(100)]
+        self.assertEqual(
+            [result.valid for result in check_cpfs(cpfs)],
+            [reference_cpf_is_valid(cpf) for cpf in cpfs],
+        )
+        self.assertGreater(sum(map(reference_cpf_is_valid, cpfs)), 50)
+
+    def test_serializer_accepts_formatted_cpf_and_cep(self):
+        serializer = StudentSerializer(
+            data={
+                "name": "Ana",
+                "cgm": "1",
+                "dob": "2012-03-05",
+                "gender": "F",
+                "guardian": "Maria",
+                "guardian_cpf": "123.456.789-09",
+                "address": "Rua A",
+                "cep": "86010-000",
+                "city": "Londrina",
+                "state": "PR",
+            }
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data["guardian_cpf"], "12345678909")
+        self.assertEqual(serializer.validated_data["cep"], "86010000")
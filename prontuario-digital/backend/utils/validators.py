@@ -1,60 +1,107 @@
+import re
+from operator import mul
+from typing import NamedTuple
+
 from django.core.exceptions import ValidationError
 # from django.utils.translation import gettext_lazy as _
 
+CPF_LENGTH = 11
+CEP_LENGTH = 8
+NON_DIGITS = re.compile(r"[^0-9]")
 
-def validate_cpf(guardian_cpf):
+# Weights of the first CPF check digit; the second uses each weight plus one
+# over the same nine digits, and 2 for the first check digit
+CPF_WEIGHTS = tuple(range(10, 1, -1))
+# The digits are summed as their ASCII codes; subtracting ord("0") times the
+# weight total once gives the same sum as converting every digit to int
+CPF_OFFSET = ord("0") * sum(CPF_WEIGHTS)
+ZERO = ord("0")
+# Expected check digit (as an ASCII code) for each remainder of sum % 11
+CPF_CHECK_DIGITS = tuple(
+    ZERO + (0 if remainder < 2 else 11 - remainder) for remainder in range(11)
+)
+
+CPF_LENGTH_ERROR = "CPF must contain 11 digits."
+CPF_INVALID_ERROR = "Invalid CPF."
+CEP_LENGTH_ERROR = "CEP must contain 8 digits."
+
+
+class CheckResult(NamedTuple):
     """
-    Validates a brazilian CPF
+    Resultado de um item de check_cpfs / check_ceps
     """
 
-    cpf = [int(digit) for digit in guardian_cpf]
+    value: object
+    normalized: str
+    error: str | None
 
-    if len(guardian_cpf) != 11:
-        raise ValidationError("CPF must contain 11 digits.")
+    @property
+    def valid(self):
+        return self.error is None
+
+
+def normalize_digits(value):
+    """
+    Só os dígitos (0-9) de um CPF/CEP digitado com pontuação
+    """
+    value = str(value)
+    if value.isascii() and value.isdigit():
+        return value
+    return NON_DIGITS.sub("", value)
 
-    # If all digits are the same
-    if guardian_cpf == guardian_cpf[0] * 11:
-        raise ValidationError("Invalid CPF.")
 
-    def _calculate_digit(cpf_digits):
-        org_digits = cpf_digits
-        val_digits = []
-        sum = 0
-        mod = 0
+def cpf_error(cpf):
+    """
+    Mensagem de erro de um CPF já normalizado, ou None se for válido
+    """
+    if len(cpf) != CPF_LENGTH or not (cpf.isascii() and cpf.isdigit()):
+        return CPF_LENGTH_ERROR
+    if cpf == cpf[0] * CPF_LENGTH:
+        return CPF_INVALID_ERROR
 
-        for i in range(9):
-            val_digits.append(org_digits[i])
-            sum += org_digits[i] * (10 - i)
+    codes = cpf.encode()
+    # map() stops at the shorter side, so only the first nine digits count
+    first = sum(map(mul, codes, CPF_WEIGHTS)) - CPF_OFFSET
+    if codes[9] != CPF_CHECK_DIGITS[first % 11]:
+        return CPF_INVALID_ERROR
+    second = first + sum(codes[:9]) - 9 * ZERO + 2 * (codes[9] - ZERO)
+    if codes[10] != CPF_CHECK_DIGITS[second % 11]:
+        return CPF_INVALID_ERROR
+    return None
 
-        mod = sum % 11
 
-        if (11 - mod) > 9:
-            first_digit = 0
-        else:
-            first_digit = 11 - mod
+def cep_error(cep):
+    if len(cep) != CEP_LENGTH or not (cep.isascii() and cep.isdigit()):
+        return CEP_LENGTH_ERROR
+    return None
 
-        val_digits.append(first_digit)
-        sum = 0
 
-        for i in range(11):
-            if i > 9:
-                break
-            sum += val_digits[i] * (11 - i)
+def _check_all(values, error_of):
+    normalized = list(map(normalize_digits, values))
+    return list(map(CheckResult, values, normalized, map(error_of, normalized)))
 
-        mod = sum % 11
 
-        if (11 - mod) > 10:
-            second_digit = 0
-        else:
-            second_digit = 11 - mod
+def check_cpfs(values):
+    """
+    Normaliza e confere uma lista de CPFs; um CheckResult por item, na ordem
+    """
+    return _check_all(values, cpf_error)
 
-        val_digits.append(second_digit)
 
-        return val_digits == org_digits
+def check_ceps(values):
+    """
+    Normaliza e confere uma lista de CEPs; um CheckResult por item, na ordem
+    """
+    return _check_all(values, cep_error)
 
-    if not _calculate_digit(cpf):
-        raise ValidationError(("Invalid CPF."))
 
+def validate_cpf(guardian_cpf):
+    """
+    Validates a brazilian CPF (digits only, as stored)
+    """
+    error = cpf_error(guardian_cpf)
+    if error:
+        raise ValidationError(error)
     return guardian_cpf
 
 
@@ -0,0 +1,52 @@
+"""
+Chaves de cache versionadas. Cada recurso guarda um número de versão no
+cache e as chaves dos dados incluem a versão atual: invalidar é incrementar
+a versão, e as chaves antigas deixam de ser lidas e expiram sozinhas.
+"""
+
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def new_version():
+    # Start from the clock so a version evicted from the cache never
+    # restarts at a number that still has stale data stored under it
+    return time.time_ns()
+
+
+def current_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, new_version(), timeout=None)
+
+
+def invalidate(*keys):
+    """
+    Bump now and again after commit (one callback for all keys): a request
+    that reads between the two could cache pre-commit data under the
+    intermediate version.
+    """
+
+    def bump():
+        for key in keys:
+            bump_version(key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def digest(state):
+    return hashlib.sha256(json.dumps(state, default=str).encode()).hexdigest()[:16]